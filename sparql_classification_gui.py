@@ -28,6 +28,21 @@ import datetime
 import time
 import json
 import csv
+import threading
+import queue
+import re
+import bisect
+import atexit
+import sqlite3
+import hashlib
+import mmap
+import struct
+from array import array
+import cProfile
+from contextlib import contextmanager
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
 from typing import List, Dict, Tuple, Any, Optional
 
 # ------------
@@ -36,10 +51,32 @@ from typing import List, Dict, Tuple, Any, Optional
 
 # These defaults can be changed by command line arguments
 DEFAULT_ENDPOINT = 'https://sparql.vanderbilt.edu/sparql' # arg: --endpoint or -E 
+ENDPOINTS = [DEFAULT_ENDPOINT] # Mirror endpoints; arg: --endpoint or -E with comma-separated URLs
+HEDGE_PERCENTILE = 95 # Send a duplicate query to a second mirror when the first is slower than this percentile of its latencies
 DEFAULT_METHOD = 'get' # arg: --method or -M
 CSV_OUTPUT_PATH = 'sparql_results.csv' # arg: --results or -R
 PREFIXES_DOC_PATH = 'prefixes.txt' # arg: --prefixes or -P
 USER_AGENT = 'sparql_classification_gui/' + SCRIPT_VERSION + ' ()'
+QUERY_TIMEOUT = 60 # Seconds to wait for a query response; arg: --timeout or -T
+DUMP_TIMEOUT = 1800 # Seconds to wait for the response to a bulk download, 0 to wait indefinitely; arg: --dump-timeout
+INDEX_PATH = 'concept_index.json' # Local search index of concept labels; arg: --index or -I
+BUILD_INDEX = False # Build the search index and exit without opening the GUI; arg: --build-index
+SNAPSHOT_PATH = 'concept_snapshot.bin' # Local snapshot of the concept graph, used instead of queries if it exists; arg: --snapshot or -S
+BUILD_SNAPSHOT = False # Build the snapshot and exit without opening the GUI; arg: --build-snapshot
+MIRROR_PATH = 'concept_mirror.db' # SQLite copy of the triples used to build the snapshot; arg: --mirror
+SYNC = False # Update the mirror with the changes at the endpoint, rebuild the snapshot and exit; arg: --sync
+SYNC_GRAPHS = '' # Comma-separated named graphs to sync, all graphs with the triples used if empty; arg: --graphs
+CROSSWALK_MODE = 'query' # How equivalent concepts are found: query, preload or lazy; arg: --crosswalks or -C
+CROSSWALK_GRAPH = 'https://art-classification-crosswalks'
+TRACE_PATH = '' # Save a Chrome trace of GUI actions and queries to this path at exit; arg: --trace
+PROFILE_DIR = '' # Save cProfile statistics for each action in this directory; arg: --profile
+CRAWL_REPORT_PATH = '' # Crawl all three schemes, save a coverage report as CSV and exit; arg: --crawl
+CRAWL_WORKERS = 4 # Number of concepts crawled at the same time; arg: --workers
+CRAWL_DEPTH = None # Number of levels below the roots to crawl, None for all; arg: --depth
+CACHE_PATH = '' # SQLite file for caching query responses, no caching if empty; arg: --cache
+CACHE_MAX_AGE = 604800 # Seconds before a cached response expires (one week); arg: --cache-age
+WARM_UP_DEPTH = None # Pre-populate the response cache for this number of levels below the roots and exit; arg: --warm-up
+CRAWL_ROOTS = '' # Comma-separated scheme=IRI pairs to start crawling from instead of the top concepts; arg: --roots
 
 starting_classification_label = 'tray'
 starting_current_scheme = 'wikidata'
@@ -68,8 +105,16 @@ LABEL = {'nomenclature': 'Tray',
                   'wikidata': 'tray',
                   'broader': 'container'}
 
-# Attempt to make the subclass buttons global so they can be destroyed and recreated.
-EXISTING_SUBCLASS_BUTTONS = []
+# Navigation state. Each navigation gets the next generation number, and only the view built by the
+# latest navigation is displayed. Finished views are passed from the worker threads to the GUI through the queue.
+NAVIGATION_GENERATION = 0
+NAVIGATION_RESULTS = queue.Queue()
+
+# Approximate limit on the memory used by the snapshots of the views in the back/forward history.
+HISTORY_MAX_BYTES = 20000000
+
+# Number of subclass buttons visible at one time. Longer lists of subclasses are scrolled.
+SUBCLASS_ROWS = 10
 
 # ------------
 # Support command line arguments
@@ -97,16 +142,53 @@ if '--version' in arg_vals or '-V' in arg_vals: # provide version information ac
 if '--help' in arg_vals or '-H' in arg_vals: # provide help information according to GNU standards
     # needs to be expanded to include brief info on invoking the program
     print('''Command line arguments:
---endpoint or -E to specify a SPARQL endpoint URL, default: ''' + DEFAULT_ENDPOINT + '''
+--endpoint or -E to specify a SPARQL endpoint URL, or a comma-separated list of URLs of mirror endpoints, default: ''' + DEFAULT_ENDPOINT + '''
 --method or -M to specify the HTTP method (get or post) to send the query, default: ''' + DEFAULT_METHOD + '''
 --results or -R to specify the path (including filename) to save the CSV results, default: ''' + CSV_OUTPUT_PATH + '''
 --agent or -A to specify your own user agent string to be sent with the query, default: ''' + USER_AGENT + '''
+--timeout or -T to specify the number of seconds to wait for a query response, default: ''' + str(QUERY_TIMEOUT) + '''
+--dump-timeout to specify the number of seconds to wait for a bulk download when building the index or the snapshot, syncing the mirror or loading the crosswalk graph, or 0 to wait indefinitely, default: ''' + str(DUMP_TIMEOUT) + '''
+--index or -I to specify the path (including filename) of the concept search index, default: ''' + INDEX_PATH + '''
+--crosswalks or -C to specify how equivalent concepts are found, default: ''' + CROSSWALK_MODE + '''
+    query: send a query to the crosswalk graph for each concept
+    preload: load the whole crosswalk graph into memory at startup
+    lazy: load the whole crosswalk graph into memory when it is first needed
+--trace to save a trace of the GUI actions and queries to a Chrome trace JSON file at exit (open it in chrome://tracing or https://ui.perfetto.dev)
+--profile to specify a directory in which to save cProfile statistics (.prof files) for each action
+--crawl to specify the path (including filename) of a CSV coverage report, crawl all three schemes from their roots, and exit
+    The crawl saves its progress in the same path with .checkpoint.json added, and resumes from it if it is run again.
+--workers to specify the number of concepts crawled at the same time, default: ''' + str(CRAWL_WORKERS) + '''
+--depth to specify the number of levels below the roots to crawl, default: all
+--roots to specify comma-separated scheme=IRI pairs to crawl from, default: the top concepts of each scheme
+--cache to specify the path (including filename) of an SQLite file in which to cache query responses, default: no caching
+--cache-age to specify the number of seconds before a cached response expires, default: ''' + str(CACHE_MAX_AGE) + '''
+--warm-up to specify a number of levels below the roots (see --roots) for which to pre-populate the response cache, and exit
+    Uses --cache, --workers and --roots.
+--build-index to download the labels of all concepts, save them as the search index, and exit
+--snapshot or -S to specify the path (including filename) of the snapshot of the concept graph, default: ''' + SNAPSHOT_PATH + '''
+    If the file exists, hierarchy, label, crosswalk and artwork lookups use it instead of sending queries.
+--build-snapshot to download the concept graph, save it as the snapshot, and exit
+--mirror to specify the path (including filename) of the SQLite copy of the triples used to build the snapshot, default: ''' + MIRROR_PATH + '''
+--sync to download only the changes since the last sync into the mirror, rebuild the snapshot from the mirror if anything changed, and exit
+    Uses --dump-timeout for the downloads.
+--graphs to specify comma-separated IRIs of the named graphs to sync, default: all graphs with the triples used
 
 ''')
     print('Report bugs to: steve.baskauf@vanderbilt.edu')
     print()
     sys.exit()
 
+# Remove arguments without values to avoid disrupting pairing of other arguments
+if '--build-index' in arg_vals: # build the concept search index instead of opening the GUI
+    arg_vals.remove('--build-index')
+    BUILD_INDEX = True
+if '--build-snapshot' in arg_vals: # build the concept graph snapshot instead of opening the GUI
+    arg_vals.remove('--build-snapshot')
+    BUILD_SNAPSHOT = True
+if '--sync' in arg_vals: # update the mirror and snapshot instead of opening the GUI
+    arg_vals.remove('--sync')
+    SYNC = True
+
 # Code from https://realpython.com/python-command-line-arguments/#a-few-methods-for-parsing-python-command-line-arguments
 opts = [opt for opt in arg_vals if opt.startswith('-')]
 args = [arg for arg in arg_vals if not arg.startswith('-')]
@@ -115,6 +197,9 @@ if '--endpoint' in opts: # specifies a Wikibase SPARQL endpoint different from t
     DEFAULT_ENDPOINT = args[opts.index('--endpoint')]
 if '-E' in opts: # specifies a Wikibase SPARQL endpoint different from the Wikidata Query Service
     DEFAULT_ENDPOINT = args[opts.index('-E')]
+# More than one endpoint can be given as a comma-separated list. The first one is used for updates.
+ENDPOINTS = [endpoint.strip() for endpoint in DEFAULT_ENDPOINT.split(',') if endpoint.strip() != '']
+DEFAULT_ENDPOINT = ENDPOINTS[0]
 
 if '--results' in opts: # specifies path (including filename) where CSV will be saved
     CSV_OUTPUT_PATH = args[opts.index('--results')]
@@ -136,6 +221,67 @@ if '--agent' in opts: # to provide your own user agent string to be sent with th
 if '-A' in opts: # to provide your own user agent string to be sent with the query
     USER_AGENT = args[opts.index('-A')]
 
+if '--timeout' in opts: # specifies the number of seconds to wait for a query response
+    QUERY_TIMEOUT = float(args[opts.index('--timeout')])
+if '-T' in opts: # specifies the number of seconds to wait for a query response
+    QUERY_TIMEOUT = float(args[opts.index('-T')])
+
+if '--dump-timeout' in opts: # specifies the number of seconds to wait for a bulk download, 0 to wait indefinitely
+    DUMP_TIMEOUT = float(args[opts.index('--dump-timeout')])
+if not DUMP_TIMEOUT:
+    DUMP_TIMEOUT = None # requests waits indefinitely when the timeout is None
+
+if '--index' in opts: # specifies path (including filename) of the concept search index
+    INDEX_PATH = args[opts.index('--index')]
+if '-I' in opts: # specifies path (including filename) of the concept search index
+    INDEX_PATH = args[opts.index('-I')]
+
+if '--snapshot' in opts: # specifies path (including filename) of the concept graph snapshot
+    SNAPSHOT_PATH = args[opts.index('--snapshot')]
+if '-S' in opts: # specifies path (including filename) of the concept graph snapshot
+    SNAPSHOT_PATH = args[opts.index('-S')]
+
+if '--mirror' in opts: # specifies path (including filename) of the mirror of the triples used to build the snapshot
+    MIRROR_PATH = args[opts.index('--mirror')]
+
+if '--graphs' in opts: # specifies the named graphs to sync
+    SYNC_GRAPHS = args[opts.index('--graphs')]
+
+if '--crosswalks' in opts: # specifies how equivalent concepts are found
+    CROSSWALK_MODE = args[opts.index('--crosswalks')]
+if '-C' in opts: # specifies how equivalent concepts are found
+    CROSSWALK_MODE = args[opts.index('-C')]
+if CROSSWALK_MODE not in ['query', 'preload', 'lazy']:
+    print('Unknown value for --crosswalks:', CROSSWALK_MODE + '. Use query, preload or lazy.')
+    sys.exit()
+
+if '--trace' in opts: # specifies path (including filename) of the Chrome trace file
+    TRACE_PATH = args[opts.index('--trace')]
+
+if '--profile' in opts: # specifies the directory for the cProfile statistics
+    PROFILE_DIR = args[opts.index('--profile')]
+
+if '--crawl' in opts: # specifies path (including filename) of the coverage report
+    CRAWL_REPORT_PATH = args[opts.index('--crawl')]
+
+if '--workers' in opts: # specifies the number of concepts crawled at the same time
+    CRAWL_WORKERS = int(args[opts.index('--workers')])
+
+if '--depth' in opts: # specifies the number of levels below the roots to crawl
+    CRAWL_DEPTH = int(args[opts.index('--depth')])
+
+if '--roots' in opts: # specifies the concepts to crawl from
+    CRAWL_ROOTS = args[opts.index('--roots')]
+
+if '--cache' in opts: # specifies path (including filename) of the response cache
+    CACHE_PATH = args[opts.index('--cache')]
+
+if '--cache-age' in opts: # specifies the number of seconds before a cached response expires
+    CACHE_MAX_AGE = float(args[opts.index('--cache-age')])
+
+if '--warm-up' in opts: # specifies the number of levels of the response cache to pre-populate
+    WARM_UP_DEPTH = int(args[opts.index('--warm-up')])
+
 # Open the prefixes file and read it in as a string
 try:
     with open(PREFIXES_DOC_PATH, 'r') as prefixes_doc:
@@ -148,117 +294,290 @@ except:
 # ------------
 def change_scheme_button(new_scheme: str) -> None:
     """Handle the click of the "Switch to ..." buttons"""
-    # Indicate that EXISTING_SUBCLASS_BUTTONS is a global variable
-    global EXISTING_SUBCLASS_BUTTONS
+    with TRACER.span('change_scheme_button', scheme=new_scheme):
+        if not show_from_history(new_scheme, CLASSIFICATION[new_scheme]):
+            start_navigation(build_scheme_view, new_scheme)
 
-    # Determine whether the existing broader classification is empty or not. If empty, the broader
-    # button will be hidden and needs to be redisplayed.
-    if CLASSIFICATION['broader'] == '':
-        need_to_display_broader_button = True
-    else:
-        need_to_display_broader_button = False
+def parent_concept_button(scheme_name: str) -> None:
+    """Handle the click of the "Broader ..." button by making the parent concept the current classification."""
+    with TRACER.span('parent_concept_button', scheme=scheme_name):
+        # The broader concept is usually a view that was just displayed, so try the history first.
+        if not show_from_history(scheme_name, CLASSIFICATION['broader']):
+            start_navigation(build_parent_view, scheme_name)
+
+def move_to_subclass(subclass_iri: str) -> None:
+    """Handle the click of one of the subclass buttons"""
+    with TRACER.span('move_to_subclass', iri=subclass_iri):
+        scheme_name = scheme_from_iri(subclass_iri)
+        if not show_from_history(scheme_name, subclass_iri, broader=(CLASSIFICATION[scheme_name], LABEL[scheme_name])):
+            start_navigation(build_subclass_view, subclass_iri)
+
+def jump_to_concept(concept_iri: str) -> None:
+    """Handle the choice of a concept from the search suggestions"""
+    with TRACER.span('jump_to_concept', iri=concept_iri):
+        if not show_from_history(scheme_from_iri(concept_iri), concept_iri):
+            start_navigation(build_concept_view, concept_iri)
+
+def refresh_crosswalks_button() -> None:
+    """Handle the click of the "Refresh crosswalks" button by reloading the crosswalk graph in the background."""
+    thread = threading.Thread(target=CROSSWALKS.refresh, kwargs={'verbose': True}, daemon=True)
+    thread.start()
+
+def back_button() -> None:
+    """Handle the click of the "Back" button by displaying the previous view in the history."""
+    with TRACER.span('back_button'):
+        view = HISTORY.back()
+        if view is not None:
+            show_snapshot(view)
+
+def forward_button() -> None:
+    """Handle the click of the "Forward" button by displaying the next view in the history."""
+    with TRACER.span('forward_button'):
+        view = HISTORY.forward()
+        if view is not None:
+            show_snapshot(view)
+
+def show_from_history(scheme_name: str, concept_iri: str, broader: Optional[Tuple[str, str]] = None) -> bool:
+    """Display the most recent snapshot of a concept from the history as a new navigation, without any queries.
+    Returns False if the concept isn't in the history.
+
+    When the concept is reached as a subclass, broader is the IRI and label of the concept it was reached from.
+    A concept can have several broader concepts, so a snapshot reached from another one is copied with the
+    broader classification replaced, as build_subclass_view would have set it."""
+    view = HISTORY.find(scheme_name, concept_iri)
+    if view is None:
+        return False
+    if broader is not None and view['classification'].get('broader') != broader[0]:
+        view = dict(view, classification=dict(view['classification']), label=dict(view['label']))
+        view['classification']['broader'], view['label']['broader'] = broader
+    HISTORY.push(view)
+    show_snapshot(view)
+    return True
+
+def show_snapshot(view: Dict[str, Any]) -> None:
+    """Display a snapshot of a view, superseding any navigation that is still running."""
+    global NAVIGATION_GENERATION
+    NAVIGATION_GENERATION += 1
+    apply_view(view)
+
+def start_navigation(build_function, argument: str) -> None:
+    """Start building a new view in a background thread, superseding any navigation that is still running.
+
+    Each navigation gets the next generation number. The queries for the view are run in a worker thread
+    using a copy of the current state, so the global CLASSIFICATION, LABEL and MATCH_TYPE dictionaries are
+    only changed when the finished view is displayed, and only if no newer navigation has started since.
+    """
+    global NAVIGATION_GENERATION
+    NAVIGATION_GENERATION += 1
+    # Link the click, the work in the worker thread and the rendering of the view in the trace.
+    TRACER.flow(NAVIGATION_GENERATION, 's')
+    view = current_view()
+    thread = threading.Thread(target=run_navigation, args=(build_function, argument, view, NAVIGATION_GENERATION), daemon=True)
+    thread.start()
+
+def run_navigation(build_function, argument: str, view: Dict[str, Any], generation: int) -> None:
+    """Build a view in a worker thread, then pass it to the GUI thread through the NAVIGATION_RESULTS queue."""
+    try:
+        with TRACER.profile(build_function.__name__), TRACER.span(build_function.__name__, generation=generation):
+            TRACER.flow(generation, 't')
+            build_function(view, argument, generation)
+    except NavigationSuperseded:
+        return # A newer navigation has started, so don't spend any more work on this one.
+    except Exception as error: # For example, a query that timed out.
+        print('Error building view:', error)
+        return
+    NAVIGATION_RESULTS.put((generation, view))
+
+def check_generation(generation: int) -> None:
+    """Raise NavigationSuperseded if a newer navigation has started since the one with this generation number."""
+    if generation != NAVIGATION_GENERATION:
+        raise NavigationSuperseded()
+
+def poll_navigation_results() -> None:
+    """Display the view of the latest navigation when it is ready. Rescheduled every 50 ms by the Tk event loop."""
+    while True:
+        try:
+            generation, view = NAVIGATION_RESULTS.get_nowait()
+        except queue.Empty:
+            break
+        if generation == NAVIGATION_GENERATION: # Ignore views from navigations that were superseded.
+            with TRACER.profile('render_view'), TRACER.span('display view', generation=generation):
+                TRACER.flow(generation, 'f')
+                HISTORY.push(view)
+                apply_view(view)
+    root.after(50, poll_navigation_results)
+
+def current_view() -> Dict[str, Any]:
+    """Return a copy of the current state that a navigation can change without affecting the display."""
+    return {'scheme': CURRENT_SCHEME_ORIENTATION['current'],
+            'classification': dict(CLASSIFICATION),
+            'label': dict(LABEL),
+            'match_type': dict(MATCH_TYPE),
+            'subclasses': [],
+            'artworks': []
+        }
 
-    # The current scheme orientation will be set to the new_scheme for the button that was clicked.
-    CURRENT_SCHEME_ORIENTATION = SCHEME_ORIENTATIONS[new_scheme]
+def apply_view(view: Dict[str, Any]) -> None:
+    """Make a view the current state and display it."""
+    global CURRENT_SCHEME_ORIENTATION
+    CURRENT_SCHEME_ORIENTATION = SCHEME_ORIENTATIONS[view['scheme']]
+    # Update the dictionaries in place, since they are shared with the rest of the script.
+    CLASSIFICATION.update(view['classification'])
+    LABEL.update(view['label'])
+    MATCH_TYPE.update(view['match_type'])
+    render_view(view)
 
-    # Reset the labels for the buttons and text box, and commands for the buttons
-    left_button.config(text='Switch to ' + CURRENT_SCHEME_ORIENTATION['left'] + '\nterm: ' + LABEL[CURRENT_SCHEME_ORIENTATION['left']], command = lambda: change_scheme_button(CURRENT_SCHEME_ORIENTATION['left']))
-    right_button.config(text='Switch to ' + CURRENT_SCHEME_ORIENTATION['right'] + '\nterm: ' + LABEL[CURRENT_SCHEME_ORIENTATION['right']], command = lambda: change_scheme_button(CURRENT_SCHEME_ORIENTATION['right']))
-    current_classification_text.set(CURRENT_SCHEME_ORIENTATION['current'] + '\nterm: ' + LABEL[CURRENT_SCHEME_ORIENTATION['current']])
+def render_view(view: Dict[str, Any]) -> None:
+    """Set the text, commands and visibility of all of the widgets to match a view."""
+    with TRACER.span('configure buttons'):
+        configure_view_buttons(view)
 
-    # Query to find the new broader category for the current classification.
-    broader_label, broader_iri = retrieve_broader_classification(CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
-    CLASSIFICATION['broader'] = broader_iri
-    LABEL['broader'] = broader_label
-    if broader_label == '': # Handle the case where there is no broader classification.
+    # Show the subclasses in the subclass panel, reusing its buttons.
+    with TRACER.span('subclass_panel.show', subclasses=len(view['subclasses'])):
+        subclass_panel.show(view['subclasses'])
+
+    with TRACER.span('update_artworks', artworks=len(view['artworks'])):
+        update_artworks(format_artworks(view['artworks']))
+
+    # Enable the history buttons only when there is somewhere to go.
+    back_history_button.config(state=NORMAL if HISTORY.can_go_back() else DISABLED)
+    forward_history_button.config(state=NORMAL if HISTORY.can_go_forward() else DISABLED)
+
+def configure_view_buttons(view: Dict[str, Any]) -> None:
+    """Set the current classification text and the broader, left and right buttons to match a view."""
+    scheme_name = view['scheme']
+    scheme_orientation = SCHEME_ORIENTATIONS[scheme_name]
+
+    current_classification_text.set(scheme_name + '\nterm: ' + view['label'][scheme_name])
+
+    if view['label']['broader'] == '': # Handle the case where there is no broader classification.
         broader_button.grid_forget()
     else:
-        broader_button.config(text='Broader ' + CURRENT_SCHEME_ORIENTATION['current'] + '\nterm: ' + broader_label, command = lambda: parent_concept_button(new_scheme))
-        if need_to_display_broader_button:
-            broader_button.grid(column=2, row=1)
+        broader_button.config(text='Broader ' + scheme_name + '\nterm: ' + view['label']['broader'], command = lambda: parent_concept_button(scheme_name))
+        broader_button.grid(column=2, row=1)
 
-    # Determine the subclasses of the new current concept and create any buttons for them.
-    subclass_list = retrieve_narrower_concepts(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
-        
-    # Destroy the existing subclass buttons
-    for button in EXISTING_SUBCLASS_BUTTONS:
-        #button.grid_forget() # removes button from grid but doesn't destroy it
-        button.destroy() # removes button from grid and destroys it
-    EXISTING_SUBCLASS_BUTTONS = [] # Not sure if this is necessary.
+    # If an equivalent concept wasn't found for a side, its button is hidden.
+    for button_position, button, column in [('left', left_button, 1), ('right', right_button, 3)]:
+        other_scheme = scheme_orientation[button_position]
+        if view['classification'][other_scheme] == '':
+            button.grid_forget()
+        else:
+            button.config(text='Switch to ' + other_scheme + '\nterm: ' + view['label'][other_scheme], command = lambda other_scheme=other_scheme: change_scheme_button(other_scheme))
+            button.grid(column=column, row=2, sticky=W)
 
-    # Create new subclass buttons
-    EXISTING_SUBCLASS_BUTTONS = generate_subclass_buttons(subclass_list)
+def build_scheme_view(view: Dict[str, Any], new_scheme: str, generation: int) -> None:
+    """Build the view for the equivalent concept in another scheme."""
+    # The equivalent concept in the new scheme becomes the current classification.
+    view['scheme'] = new_scheme
+    current_iri = view['classification'][new_scheme]
 
-    # Find the artworks that are included in the current classification
-    retrieve_included_artworks(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
+    # Query to find the new broader category for the current classification.
+    broader_label, broader_iri = retrieve_broader_classification(current_iri)
+    view['classification']['broader'] = broader_iri
+    view['label']['broader'] = broader_label
+    check_generation(generation)
 
-def parent_concept_button(scheme_name: str) -> None:
-    """Handle the click of the "Broader ..." button by making the parent concept the current classification."""
-    # Indicate that EXISTING_SUBCLASS_BUTTONS is a global variable
-    global EXISTING_SUBCLASS_BUTTONS
+    # Determine the subclasses of the new current concept.
+    view['subclasses'] = retrieve_narrower_concepts(new_scheme, current_iri)
+    check_generation(generation)
 
-    # Determine whether the existing broader classification is empty or not. If empty, the broader
-    # button will be hidden and needs to be redisplayed.
-    if CLASSIFICATION['broader'] == '':
-        need_to_display_broader_button = True
-    else:
-        need_to_display_broader_button = False
+    # Find the artworks that are included in the current classification
+    view['artworks'] = retrieve_included_artworks(new_scheme, current_iri)
 
+def build_parent_view(view: Dict[str, Any], scheme_name: str, generation: int) -> None:
+    """Build the view for the parent concept of the current classification."""
     # Set the current classification IRI and label to the broader classification
-    CLASSIFICATION[scheme_name] = CLASSIFICATION['broader']
-    LABEL[scheme_name] = LABEL['broader']
-    # I thought it should not be necessary to set this since it's a global variable and already set. But apparently it is getting a value from some previous state.
-    CURRENT_SCHEME_ORIENTATION = SCHEME_ORIENTATIONS[scheme_name]
-
-    # Reset the label for the current classification text box.
-    current_classification_text.set(CURRENT_SCHEME_ORIENTATION['current'] + '\nterm: ' + LABEL[CURRENT_SCHEME_ORIENTATION['current']])
-
-    # Make the left and right buttons invisible and clear the data for them.
-    #left_button.grid_forget()
-    #CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['left']] = ''
-    #LABEL[CURRENT_SCHEME_ORIENTATION['left']] = ''
-    #MATCH_TYPE['left'] = ''
-
-    #right_button.grid_forget()
-    #CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['right']] = ''
-    #LABEL[CURRENT_SCHEME_ORIENTATION['right']] = ''
-    #MATCH_TYPE['right'] = ''
-
-    # If there are equivalent concepts, find them and change the left and right buttons. 
-    # If an equivalent concept is not found, make the button invisible.
-    find_equivalent_concepts_and_set_buttons(CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']], CURRENT_SCHEME_ORIENTATION)
-
-    # Determine the subclasses of the new current concept and create any buttons for them.
-    subclass_list = retrieve_narrower_concepts(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
-        
-    # Destroy the existing subclass buttons
-    for button in EXISTING_SUBCLASS_BUTTONS:
-        #button.grid_forget() # removes button from grid but doesn't destroy it
-        button.destroy() # removes button from grid and destroys it
-    EXISTING_SUBCLASS_BUTTONS = [] # Not sure if this is necessary.
+    view['scheme'] = scheme_name
+    view['classification'][scheme_name] = view['classification']['broader']
+    view['label'][scheme_name] = view['label']['broader']
+    current_iri = view['classification'][scheme_name]
 
-    # Create new subclass buttons
-    EXISTING_SUBCLASS_BUTTONS = generate_subclass_buttons(subclass_list)
+    # If there are equivalent concepts, find them for the left and right buttons.
+    find_equivalent_concepts(current_iri, SCHEME_ORIENTATIONS[scheme_name], view, generation)
+    check_generation(generation)
 
-    # Query to find the new broader category for the current classification.
-    broader_label, broader_iri = retrieve_broader_classification(CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
-    CLASSIFICATION['broader'] = broader_iri
-    LABEL['broader'] = broader_label
+    # Determine the subclasses of the new current concept.
+    view['subclasses'] = retrieve_narrower_concepts(scheme_name, current_iri)
+    check_generation(generation)
 
-    if broader_label == '': # Handle the case where there is no broader classification.
-        broader_button.grid_forget()
-    else:
-        # Create the new broader button after it has the updated subclass buttons.
-        broader_button.config(text='Broader ' + CURRENT_SCHEME_ORIENTATION['current'] + '\nterm: ' + broader_label, command = lambda: parent_concept_button(scheme_name))
-        if need_to_display_broader_button:
-            broader_button.grid(column=2, row=1)
+    # Query to find the new broader category for the current classification.
+    broader_label, broader_iri = retrieve_broader_classification(current_iri)
+    view['classification']['broader'] = broader_iri
+    view['label']['broader'] = broader_label
+    check_generation(generation)
 
     # Find the artworks that are included in the higher classification
-    retrieve_included_artworks(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
+    view['artworks'] = retrieve_included_artworks(scheme_name, current_iri)
+
+def build_subclass_view(view: Dict[str, Any], subclass_iri: str, generation: int) -> None:
+    """Build the view for a subclass of the current classification."""
+    scheme_name = scheme_from_iri(subclass_iri)
+    view['scheme'] = scheme_name
+
+    # Move the CLASSIFICATION and LABEL values for the former current classification to the broader classification.
+    view['classification']['broader'] = view['classification'][scheme_name]
+    view['label']['broader'] = view['label'][scheme_name]
+
+    # Move the values of CLASSIFICATION for the chosen subclass to the current classification.
+    view['classification'][scheme_name] = subclass_iri
+    view['label'][scheme_name] = retrieve_label(subclass_iri)
+    check_generation(generation)
+
+    # Determine the subclass list for the new main classification.
+    view['subclasses'] = retrieve_narrower_concepts(scheme_name, subclass_iri)
+    check_generation(generation)
 
-def retrieve_included_artworks(current_scheme: str, superclass: str) -> None:
-    """Retrieve the artworks that are included in the specified superclass."""
+    # If there are equivalent concepts, find them for the left and right buttons.
+    find_equivalent_concepts(subclass_iri, SCHEME_ORIENTATIONS[scheme_name], view, generation)
+    check_generation(generation)
+
+    # Update the artworks that are included in the current classification
+    view['artworks'] = retrieve_included_artworks(scheme_name, subclass_iri)
+
+def build_concept_view(view: Dict[str, Any], concept_iri: str, generation: int) -> None:
+    """Build the view for any concept, which need not be related to the current classification."""
+    scheme_name = scheme_from_iri(concept_iri)
+    view['scheme'] = scheme_name
+    view['classification'][scheme_name] = concept_iri
+    view['label'][scheme_name] = retrieve_label(concept_iri)
+    check_generation(generation)
+
+    # Query to find the broader category for the concept.
+    broader_label, broader_iri = retrieve_broader_classification(concept_iri)
+    view['classification']['broader'] = broader_iri
+    view['label']['broader'] = broader_label
+    check_generation(generation)
+
+    # Determine the subclasses of the concept.
+    view['subclasses'] = retrieve_narrower_concepts(scheme_name, concept_iri)
+    check_generation(generation)
+
+    # If there are equivalent concepts, find them for the left and right buttons.
+    find_equivalent_concepts(concept_iri, SCHEME_ORIENTATIONS[scheme_name], view, generation)
+    check_generation(generation)
+
+    # Find the artworks that are included in the concept
+    view['artworks'] = retrieve_included_artworks(scheme_name, concept_iri)
+
+def scheme_from_iri(iri: str) -> str:
+    """Determine the scheme name from the domain name in an IRI."""
+    if 'nomenclature' in iri:
+        return 'nomenclature'
+    elif 'aat' in iri:
+        return 'aat'
+    elif 'wikidata' in iri:
+        return 'wikidata'
+    else:
+        raise ValueError('IRI does not contain a scheme name: ' + iri)
+
+def retrieve_included_artworks(current_scheme: str, superclass: str) -> List[Dict[str, str]]:
+    """Retrieve the artworks that are included in the specified superclass.
+    Returned values are dictionaries with the keys artwork_iri, artwork_label, class_iri and class_label."""
     #print(current_scheme, superclass)
+    if SNAPSHOT is not None:
+        artworks = SNAPSHOT.included_artworks(current_scheme, superclass)
+        if artworks is not None: # None if the concept isn't in the snapshot
+            return artworks
 
     query_string = '''PREFIX wd:      <http://www.wikidata.org/entity/>
 PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
@@ -305,21 +624,32 @@ order by ?wdClassLabel ?artworkLabel
     #print(query_string)
 
     # Send the query to the endpoint
-    data = Sparqler().query(query_string) # default to DEFAULT_ENDPOINT
+    data = Sparqler().query(query_string) # default to ENDPOINTS
     #print(json.dumps(data, indent=2))
-    output_string = ''
+    artworks = []
     for result in data:
-        artwork_iri = result['artwork']['value']
-        artwork_label = result['artworkLabel']['value']
-        class_iri = result['wdClass']['value']
-        class_label = result['wdClassLabel']['value']
-
-        output_string += '(' + class_label + ')' + artwork_iri + ' ' + artwork_label + '\n'
-    update_artworks(output_string)
+        artworks.append({'artwork_iri': result['artwork']['value'],
+                         'artwork_label': result['artworkLabel']['value'],
+                         'class_iri': result['wdClass']['value'],
+                         'class_label': result['wdClassLabel']['value']
+            })
+    return artworks
+
+def format_artworks(artworks: List[Dict[str, str]]) -> str:
+    """Format the artworks retrieved by retrieve_included_artworks() for the artworks text box."""
+    output_string = ''
+    for artwork in artworks:
+        output_string += '(' + artwork['class_label'] + ')' + artwork['artwork_iri'] + ' ' + artwork['artwork_label'] + '\n'
+    return output_string
 
 def retrieve_narrower_concepts(current_scheme: str, parent_class: str) -> List[Dict[str, str]]:
     """Retrieve the narrower concepts for a concept.
     Returned values are (label, IRI)."""
+    if SNAPSHOT is not None:
+        superclasses = SNAPSHOT.narrower(current_scheme, parent_class)
+        if superclasses is not None: # None if the concept isn't in the snapshot
+            return superclasses
+
     # Query string to find the narrower concepts for AAT, nom, or Wikidata
     query_string = '''PREFIX wd:      <http://www.wikidata.org/entity/>
 PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
@@ -372,7 +702,7 @@ order by ?superclassLabel
     #print(query_string)
 
     # Send the query to the endpoint
-    data = Sparqler().query(query_string) # default to DEFAULT_ENDPOINT
+    data = Sparqler().query(query_string) # default to ENDPOINTS
     #print(json.dumps(data, indent=2))
 
     # Get the superclass IRIs and labels and put them in a list of dictionaries.
@@ -386,6 +716,11 @@ order by ?superclassLabel
 def retrieve_broader_classification(search_string: str) -> Tuple[str, str]:
     """Retrieve the broader classification for a concept.
     Returned values are (label, IRI)."""
+    if SNAPSHOT is not None:
+        broader = SNAPSHOT.broader(search_string)
+        if broader is not None: # None if the concept isn't in the snapshot
+            return broader
+
     # Query string to find the broader classification for AAT, nom, or Wikidata
     query_string = '''PREFIX rdfs:    <http://www.w3.org/2000/01/rdf-schema#>
 PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
@@ -412,7 +747,7 @@ filter(lang(?parentLabel)="en")
     #update_artworks(search_string)
 
     # Send the query to the endpoint
-    data = Sparqler().query(query_string) # default to DEFAULT_ENDPOINT
+    data = Sparqler().query(query_string) # default to ENDPOINTS
     #print(json.dumps(data, indent=2))
     #print()
     
@@ -425,95 +760,196 @@ filter(lang(?parentLabel)="en")
 
     return(label, iri)
 
-def move_to_subclass(subclass_iri: str) -> None:
-    """Handle the click of one of the subclass buttons"""
-    # Indicate that EXISTING_SUBCLASS_BUTTONS is a global variable
-    global EXISTING_SUBCLASS_BUTTONS
-
-    #print('subclass IRI of button:', subclass_iri)
-
-    # Determine the scheme_name from the subclass_iri
-    if 'nomenclature' in subclass_iri:
-        scheme_name = 'nomenclature'
-    elif 'aat' in subclass_iri:
-        scheme_name = 'aat'
-    elif 'wikidata' in subclass_iri:
-        scheme_name = 'wikidata'
-    else:
-        print('Error: subclass IRI does not contain a scheme name')
-        sys.exit()
-
-    # I thought it should not be necessary to set this since it's a global variable and already set. But apparently it is getting a value from some previous state.
-    CURRENT_SCHEME_ORIENTATION = SCHEME_ORIENTATIONS[scheme_name]
-
-    # Determine whether the existing broader classification is empty or not. If empty, the broader
-    # button will be hidden and needs to be redisplayed.
-    if CLASSIFICATION['broader'] == '':
-        need_to_display_broader_button = True
-    else:
-        need_to_display_broader_button = False
-
-    # Move the CLASSIFICATION and LABEL values for the former current classification to the broader classification.
-    CLASSIFICATION['broader'] = CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']]
-    LABEL['broader'] = LABEL[CURRENT_SCHEME_ORIENTATION['current']]
-
-    # Change the values of the broader button to the new broader classification.
-    broader_button.config(text='Broader ' + CLASSIFICATION['broader'] + '\nterm: ' + LABEL['broader'], command = lambda: parent_concept_button(scheme_name))
-    if need_to_display_broader_button:
-        broader_button.grid(column=2, row=1)
-
-    # Move the values of CLASSIFICATION for the chosen subclass to the current classification.
-    CLASSIFICATION[scheme_name] = subclass_iri
+def retrieve_label(concept_iri: str) -> str:
+    """Retrieve the English label of a concept. Returns an empty string if there isn't one."""
+    if SNAPSHOT is not None:
+        label = SNAPSHOT.label_of(concept_iri)
+        if label: # Concepts without a label in the snapshot may still have one in the triplestore.
+            return label
 
-    # Get the label for the chosen subclass via a SPARQL query based on its subclass_iri.
     # rdfs:label for Wikidata, skos:prefLabel for nom, skosxl:prefLabel for AAT.
     # Don't specify a graph, since the labels come from various graphs.
     query_string = '''SELECT DISTINCT ?label
 WHERE {
-    {<''' + subclass_iri + '''> <http://www.w3.org/2004/02/skos/core#prefLabel> ?label} 
+    {<''' + concept_iri + '''> <http://www.w3.org/2004/02/skos/core#prefLabel> ?label} 
 UNION
-    {<''' + subclass_iri + '''> <http://www.w3.org/2000/01/rdf-schema#label> ?label}
+    {<''' + concept_iri + '''> <http://www.w3.org/2000/01/rdf-schema#label> ?label}
 UNION
-    {<''' + subclass_iri + '''> <http://www.w3.org/2008/05/skos-xl#prefLabel> ?labelObject.
+    {<''' + concept_iri + '''> <http://www.w3.org/2008/05/skos-xl#prefLabel> ?labelObject.
     ?labelObject <http://www.w3.org/2008/05/skos-xl#literalForm> ?label.}
 FILTER (lang(?label) = "en")
 }
 '''
     #print(query_string)
     #print()
-    label_data = Sparqler().query(query_string) # default to DEFAULT_ENDPOINT
+    label_data = Sparqler().query(query_string) # default to ENDPOINTS
     #print(json.dumps(label_data, indent=2))
 
-    # Get the label from the query results
-    LABEL[scheme_name] = label_data[0]['label']['value']
+    if len(label_data) == 0:
+        return ''
+    return label_data[0]['label']['value']
 
-    # Now change the label of the current classification text box.
-    current_classification_text.set(CURRENT_SCHEME_ORIENTATION['current'] + '\nterm: ' + LABEL[CURRENT_SCHEME_ORIENTATION['current']])
+def retrieve_label_dump(current_scheme: str) -> List[Dict[str, str]]:
+    """Retrieve the IRIs and English labels of all concepts in a scheme that are linked to at least one artwork.
+    Returned values are dictionaries with the keys iri and label."""
+    query_string = '''PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
+PREFIX gvp:     <http://vocab.getty.edu/ontology#>
+PREFIX skos:    <http://www.w3.org/2004/02/skos/core#>
+PREFIX skosxl:  <http://www.w3.org/2008/05/skos-xl#>
 
-    # Determine the subclass list for the new main classification and create any buttons for them.
-    subclass_list = retrieve_narrower_concepts(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])        
+SELECT DISTINCT ?concept ?label
+WHERE
+{
+?artwork wdt:P31 ?wdClass. # The concept must be linked to at least one artwork through any level.
+'''
 
-    # Destroy the existing subclass buttons
-    for button in EXISTING_SUBCLASS_BUTTONS:
-        #button.grid_remove()
-        button.destroy() # removes button from grid and destroys it
-    EXISTING_SUBCLASS_BUTTONS = [] # Not sure if this is necessary.
+    # Insert the specific part of the query string for the scheme, using the same relationships as
+    # retrieve_narrower_concepts() so that every concept that can be navigated to is included.
+    if current_scheme == 'wikidata':
+        query_string += '''?wdClass wdt:P279* ?concept.
+?concept rdfs:label ?label.
+'''
+    elif current_scheme == 'aat':
+        query_string += '''    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+?class gvp:broaderPreferred* ?concept.
+?concept skosxl:prefLabel ?l.
+?l skosxl:literalForm ?label.
+'''
+    elif current_scheme == 'nomenclature':
+        query_string += '''    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+?class skos:broader* ?concept.
+?concept skos:prefLabel ?label.
+filter(contains(str(?concept), "nomenclature"))
+'''
 
-    # Create new subclass buttons
-    EXISTING_SUBCLASS_BUTTONS = generate_subclass_buttons(subclass_list)
+    # Add the rest of the query string
+    query_string += '''filter(lang(?label) = "en")
+}
+'''
+    #print(query_string)
 
-    # If there are equivalent concepts, find them and change the left and right buttons. 
-    # If an equivalent concept is not found, make the button invisible.
-    find_equivalent_concepts_and_set_buttons(subclass_iri, CURRENT_SCHEME_ORIENTATION)
+    # Send the query to the endpoint
+    data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS; dumps are never cached, so they are never stale
+    concepts = []
+    for result in data:
+        concepts.append({'iri': result['concept']['value'], 'label': result['label']['value']})
+    return concepts
 
-    # Update the artworks that are included in the current classification
-    retrieve_included_artworks(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
+def retrieve_edge_dump(current_scheme: str) -> List[Tuple[str, str]]:
+    """Retrieve the links from every concept in a scheme that is linked to at least one artwork to its broader concepts.
+    Returned values are (narrower IRI, broader IRI)."""
+    query_string = '''PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
+PREFIX gvp:     <http://vocab.getty.edu/ontology#>
+PREFIX skos:    <http://www.w3.org/2004/02/skos/core#>
+
+SELECT DISTINCT ?concept ?parent
+WHERE
+{
+?artwork wdt:P31 ?wdClass. # The concept must be linked to at least one artwork through any level.
+'''
+
+    # Use the same relationships as retrieve_narrower_concepts().
+    if current_scheme == 'wikidata':
+        query_string += '''?wdClass wdt:P279* ?concept.
+?concept wdt:P279 ?parent.
+'''
+    elif current_scheme == 'aat':
+        query_string += '''    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+?class gvp:broaderPreferred* ?concept.
+?concept gvp:broaderPreferred ?parent.
+'''
+    elif current_scheme == 'nomenclature':
+        query_string += '''    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+?class skos:broader* ?concept.
+?concept skos:broader ?parent.
+filter(contains(str(?concept), "nomenclature"))
+'''
+    query_string += '''}
+'''
+
+    data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS; dumps are never cached, so they are never stale
+    return [(result['concept']['value'], result['parent']['value']) for result in data]
+
+def retrieve_match_dump() -> List[Tuple[str, str]]:
+    """Retrieve the AAT and Nomenclature concepts that the Wikidata classes of artworks are matched to.
+    Returned values are (concept IRI, Wikidata class IRI)."""
+    query_string = '''PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
+PREFIX skos:    <http://www.w3.org/2004/02/skos/core#>
+
+SELECT DISTINCT ?class ?wdClass
+WHERE
+{
+?artwork wdt:P31 ?wdClass.
+    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+}
+'''
+    data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS; dumps are never cached, so they are never stale
+    return [(result['class']['value'], result['wdClass']['value']) for result in data]
+
+def retrieve_artwork_dump() -> List[Dict[str, str]]:
+    """Retrieve every artwork with an English label and its Wikidata class.
+    Returned values are dictionaries with the keys class_iri, artwork_iri and artwork_label."""
+    query_string = '''PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
+
+SELECT DISTINCT ?wdClass ?artwork ?artworkLabel
+WHERE
+{
+?artwork wdt:P31 ?wdClass.
+?artwork rdfs:label ?artworkLabel.
+filter(lang(?artworkLabel) = "en")
+}
+'''
+    data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS; dumps are never cached, so they are never stale
+    artworks = []
+    for result in data:
+        artworks.append({'class_iri': result['wdClass']['value'],
+                         'artwork_iri': result['artwork']['value'],
+                         'artwork_label': result['artworkLabel']['value']
+            })
+    return artworks
+
+def find_equivalent_concepts(classification_iri: str, scheme_orientation: Dict[str, str], view: Dict[str, Any], generation: int) -> None:
+    """Look for equivalent concepts and set them as the left and right concepts of the view."""
+    equivalents = retrieve_equivalents(classification_iri)
+
+    # Based on the equivalents, set the match type, concept IRI and label of the concept in the specified button position.
+    for side in ['left', 'right']:
+        check_generation(generation)
+        set_equivalent_concept_data(scheme_orientation, equivalents.get(scheme_orientation[side], []), side, view)
+
+def retrieve_equivalents(classification_iri: str) -> Dict[str, List[Tuple[str, str]]]:
+    """Retrieve the concepts that a concept is linked to in the crosswalk graph, as (predicate IRI, concept IRI)
+    pairs grouped by scheme. Uses the in-memory crosswalk index if there is one, then the snapshot, otherwise a SPARQL query."""
+    if CROSSWALKS is not None:
+        return CROSSWALKS.equivalents(classification_iri)
+    if SNAPSHOT is not None:
+        equivalents = SNAPSHOT.equivalents(classification_iri)
+        if equivalents is not None: # None if the concept isn't in the snapshot
+            return equivalents
 
-def find_equivalent_concepts_and_set_buttons(classification_iri: str, scheme_orientation: Dict[str, str]) -> None:
-    """Perform a SPARQL query to look for equivalent concepts and set the left and right buttons."""
     # Create a query string to try to get the equivalent concepts for the current scheme.
     query_string = '''SELECT DISTINCT ?o ?p ?label
-FROM <https://art-classification-crosswalks>
+FROM <''' + CROSSWALK_GRAPH + '''>
 WHERE {
 <''' + classification_iri + '''> ?p ?o.
 }
@@ -521,79 +957,286 @@ WHERE {
     #print(query_string)
 
     # Send the query to the endpoint
-    data = Sparqler().query(query_string) # default to DEFAULT_ENDPOINT
+    data = Sparqler().query(query_string) # default to ENDPOINTS
     #print(json.dumps(data, indent=2))
     #print()
+    return group_equivalents([(result['p']['value'], result['o']['value']) for result in data])
+
+def group_equivalents(pairs: List[Tuple[str, str]]) -> Dict[str, List[Tuple[str, str]]]:
+    """Group (predicate IRI, concept IRI) pairs by the scheme of the concept. Concepts in no scheme are left out."""
+    equivalents = {}
+    for predicate_iri, concept_iri in pairs:
+        for scheme in SCHEME_ORIENTATIONS:
+            if scheme in concept_iri: # Check if the scheme name is in the domain name for the given scheme
+                equivalents.setdefault(scheme, []).append((predicate_iri, concept_iri))
+    return equivalents
+
+def set_equivalent_concept_data(scheme_orientation: Dict[str, str], matches: List[Tuple[str, str]], button_position: str, view: Dict[str, Any]) -> None:
+    """Retrieve and set the match type, concept IRI and label of the concept in the specified button position.
+    matches are the (predicate IRI, concept IRI) pairs for the scheme of that position.
+    """
+    if matches:
+        # If there is more than one match, the last one is used.
+        predicate_iri, concept_iri = matches[-1]
+        view['match_type'][button_position] = predicate_iri.split('#')[1] # Match type is the local name
+        #print('match type:', view['match_type'][button_position])
+        view['classification'][scheme_orientation[button_position]] = concept_iri
+        #print('concept IRI:', concept_iri)
+
+        # Get the label for the concept.
+        view['label'][scheme_orientation[button_position]] = retrieve_label(concept_iri)
+    else:
+        # If no match was found, clear the data for the side. Its button will be hidden.
+        view['match_type'][button_position] = ''
+        view['classification'][scheme_orientation[button_position]] = ''
+        view['label'][scheme_orientation[button_position]] = ''
+
+def retrieve_root_concepts(current_scheme: str) -> List[Dict[str, str]]:
+    """Retrieve the top concepts of a scheme: those linked to at least one artwork that have no broader concept.
+    Returned values are dictionaries with the keys iri and label."""
+    query_string = '''PREFIX wdt:     <http://www.wikidata.org/prop/direct/>
+PREFIX gvp:     <http://vocab.getty.edu/ontology#>
+PREFIX skos:    <http://www.w3.org/2004/02/skos/core#>
+PREFIX skosxl:  <http://www.w3.org/2008/05/skos-xl#>
 
-    # Based on the data from the query, set the match type, concept IRI and label of the concept in the specified button position.
-    for side in ['left', 'right']:
-        set_equivalent_button_concept_data(scheme_orientation, data, side)
+SELECT DISTINCT ?root ?rootLabel
+WHERE
+{
+?artwork wdt:P31 ?wdClass. # The root must be linked to at least one artwork through any level.
+'''
 
-def set_equivalent_button_concept_data(scheme_orientation: Dict[str, str], data: List, button_position: str) -> None:
-    """Retrieve and set the match type, concept IRI and label of the concept in the specified button position.
+    # Insert the specific part of the query string for the scheme, using the same relationships as
+    # retrieve_narrower_concepts().
+    if current_scheme == 'wikidata':
+        query_string += '''?wdClass wdt:P279* ?root.
+filter not exists {?root wdt:P279 ?parent.}
+?root rdfs:label ?rootLabel.
+'''
+    elif current_scheme == 'aat':
+        query_string += '''    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+?class gvp:broaderPreferred* ?root.
+filter not exists {?root gvp:broaderPreferred ?parent.}
+?root skosxl:prefLabel ?l.
+?l skosxl:literalForm ?rootLabel.
+'''
+    elif current_scheme == 'nomenclature':
+        query_string += '''    {?wdClass skos:exactMatch ?class.} 
+UNION 
+    {?wdClass skos:broadMatch ?class.}
+UNION
+    {?wdClass skos:closeMatch ?class.}
+?class skos:broader* ?root.
+filter(contains(str(?root), "nomenclature"))
+filter not exists {?root skos:broader ?parent.}
+?root skos:prefLabel ?rootLabel.
+'''
+
+    # Add the rest of the query string
+    query_string += '''filter(lang(?rootLabel) = "en")
+}
+order by ?rootLabel
+'''
+    data = Sparqler().query(query_string) # default to ENDPOINTS
+    roots = []
+    for result in data:
+        roots.append({'iri': result['root']['value'], 'label': result['rootLabel']['value']})
+    return roots
+
+def crawl_roots(roots_argument: str = '') -> List[Dict[str, Any]]:
+    """Return the starting nodes of a crawl of all three schemes.
+
+    roots_argument is a comma-separated list of scheme=IRI pairs (from the --roots argument). The roots of
+    schemes that aren't in the list are found with retrieve_root_concepts().
     """
-    # Indicate that EXISTING_SUBCLASS_BUTTONS is a global variable
-    global EXISTING_SUBCLASS_BUTTONS
+    given_roots = {}
+    for pair in roots_argument.split(','):
+        if '=' in pair:
+            scheme, iri = pair.split('=', 1)
+            given_roots.setdefault(scheme.strip(), []).append(iri.strip())
+
+    nodes = []
+    for scheme in SCHEME_ORIENTATIONS:
+        if scheme in given_roots:
+            roots = [{'iri': iri, 'label': retrieve_label(iri)} for iri in given_roots[scheme]]
+        else:
+            roots = retrieve_root_concepts(scheme)
+        for root_concept in roots:
+            nodes.append({'scheme': scheme, 'iri': root_concept['iri'], 'label': root_concept['label'], 'depth': 0, 'parent': ''})
+    return nodes
+
+def crawl_hierarchy(roots: List[Dict[str, Any]], visit_function, max_workers: int = 4, max_depth: Optional[int] = None, checkpoint_path: str = '', report_path: str = '', report_fields: Optional[List[str]] = None, verbose: bool = True) -> Dict[str, Any]:
+    """Walk the hierarchies breadth-first from the root nodes, visiting up to max_workers concepts at the same time.
 
-    if CLASSIFICATION[scheme_orientation[button_position]] == '':
-        need_to_display_button = True
+    Parameters
+    ----------
+    roots : list of dict
+        The starting nodes. Each node is a dictionary with the keys scheme, iri, label, depth and parent.
+    visit_function : function
+        Called with a node. Returns a tuple of (report row dictionary, list of narrower concepts as dictionaries
+        with the keys iri and label).
+    max_workers : int
+        Number of concepts visited at the same time.
+    max_depth : int
+        Concepts deeper than this number of levels below the roots aren't visited. None for no limit.
+    checkpoint_path : str
+        If provided, the progress of the crawl is saved to this JSON file after each batch of concepts, and a
+        crawl with the same checkpoint file continues where the last one stopped.
+    report_path : str
+        If provided, the report rows are appended to this CSV file after each batch. When a crawl is resumed, the
+        report is cut back to the rows recorded in the checkpoint, so no row is written twice.
+    report_fields : list of str
+        Column headers of the report.
+    verbose : bool
+        Prints progress and throughput when True.
+
+    Returns
+    -------
+    A dictionary with the keys "nodes" (concepts visited, including by earlier runs of the crawl), "failed"
+    (nodes that couldn't be visited), "elapsed" (seconds in this run) and "nodes_per_second" (in this run).
+
+    Notes
+    -----
+    A concept with more than one broader concept is only visited once, by way of the first one reached.
+    Concepts that fail to be visited (for example because of a timeout) are saved in the checkpoint and are
+    tried again when the crawl is resumed.
+    """
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, 'rt', encoding='utf-8') as file_object:
+            checkpoint = json.load(file_object)
+        frontier = deque(checkpoint['failed'] + checkpoint['frontier'])
+        visited = set(checkpoint['visited'])
+        nodes_done = checkpoint['nodes']
+        report_rows = checkpoint['report_rows']
+        if report_path:
+            # The checkpoint is saved before the rows of its batch are added to the report, so the crawl may have
+            # stopped before, during or after adding them. Rewrite the report with the rows from before the batch
+            # followed by the rows of the batch.
+            rows_before = []
+            if os.path.exists(report_path):
+                with open(report_path, 'rt', newline='', encoding='utf-8') as file_object:
+                    rows_before = list(csv.DictReader(file_object))[:report_rows - len(checkpoint['batch_rows'])]
+            with open(report_path, 'wt', newline='', encoding='utf-8') as file_object:
+                writer = csv.DictWriter(file_object, fieldnames=report_fields)
+                writer.writeheader()
+                writer.writerows(rows_before + checkpoint['batch_rows'])
+        if verbose:
+            print('Resuming crawl from', checkpoint_path + ':', nodes_done, 'concepts done,', len(frontier), 'to go')
     else:
-        need_to_display_button = False
-
-    # Keep track of whether a match was found for the side.
-    found_match_for_side = False
-
-    for equivalent in data:
-        concept_iri = equivalent['o']['value'] # Get the IRI of the equivalent concept
-        if scheme_orientation[button_position] in concept_iri: # Check if the scheme name is in the domain name for the given scheme
-            found_match_for_side = True
-            MATCH_TYPE[button_position] = equivalent['p']['value'].split('#')[1] # Match type is the local name
-            #print('match type:', MATCH_TYPE[button_position])
-            CLASSIFICATION[scheme_orientation[button_position]] = concept_iri
-            #print('concept IRI:', concept_iri)
-
-            # Query to get the label for the concept. rdfs:label for Wikidata, skos:prefLabel for nom, skosxl:prefLabel for AAT.
-            # Don't specify a graph, since the labels come from various graphs.
-            query_string = '''SELECT DISTINCT ?label
-        WHERE {
-            {<''' + concept_iri + '''> <http://www.w3.org/2004/02/skos/core#prefLabel> ?label} 
-        UNION
-            {<''' + concept_iri + '''> <http://www.w3.org/2000/01/rdf-schema#label> ?label}
-        UNION
-            {<''' + concept_iri + '''> <http://www.w3.org/2008/05/skos-xl#prefLabel> ?labelObject.
-            ?labelObject <http://www.w3.org/2008/05/skos-xl#literalForm> ?label.}
-        FILTER (lang(?label) = "en")
+        frontier = deque(roots)
+        visited = set(node['scheme'] + ' ' + node['iri'] for node in roots)
+        nodes_done = 0
+        report_rows = 0
+        if report_path:
+            with open(report_path, 'wt', newline='', encoding='utf-8') as file_object:
+                csv.DictWriter(file_object, fieldnames=report_fields).writeheader()
+
+    def safe_visit(node):
+        try:
+            return visit_function(node)
+        except Exception as error: # For example, a query that timed out.
+            print('Error visiting', node['iri'] + ':', error)
+            return None
+
+    failed = []
+    nodes_this_run = 0
+    batch_size = max_workers * 10
+    start_time = datetime.datetime.now()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while frontier:
+            batch = [frontier.popleft() for index in range(min(batch_size, len(frontier)))]
+            rows = []
+            for node, result in zip(batch, executor.map(safe_visit, batch)):
+                if result is None:
+                    failed.append(node)
+                    continue
+                row, narrower_concepts = result
+                rows.append(row)
+                if max_depth is None or node['depth'] < max_depth:
+                    for concept in narrower_concepts:
+                        key = node['scheme'] + ' ' + concept['iri']
+                        if key not in visited:
+                            visited.add(key)
+                            frontier.append({'scheme': node['scheme'], 'iri': concept['iri'], 'label': concept['label'], 'depth': node['depth'] + 1, 'parent': node['iri']})
+            nodes_done += len(rows)
+            nodes_this_run += len(rows)
+            if report_path:
+                report_rows += len(rows)
+
+            if checkpoint_path:
+                # Write to a temporary file first so that an interrupted save doesn't destroy the checkpoint.
+                # The rows of the batch are saved too, so a resumed crawl can repair the report (see above).
+                with open(checkpoint_path + '.tmp', 'wt', encoding='utf-8') as file_object:
+                    json.dump({'frontier': list(frontier), 'visited': list(visited), 'failed': failed, 'nodes': nodes_done,
+                               'report_rows': report_rows, 'batch_rows': rows if report_path else []}, file_object)
+                os.replace(checkpoint_path + '.tmp', checkpoint_path)
+            if report_path:
+                with open(report_path, 'at', newline='', encoding='utf-8') as file_object:
+                    csv.DictWriter(file_object, fieldnames=report_fields).writerows(rows)
+            if verbose:
+                elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
+                print(nodes_done, 'concepts done,', len(frontier), 'queued, at depth ' + str(batch[-1]['depth']) + ',', round(nodes_this_run / elapsed_time, 2), 'concepts/s')
+
+    # A finished crawl starts over the next time, unless some concepts still need to be retried.
+    if checkpoint_path and not failed and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
+    summary = {'nodes': nodes_done,
+               'failed': failed,
+               'elapsed': elapsed_time,
+               'nodes_per_second': nodes_this_run / elapsed_time if elapsed_time > 0 else 0.0
         }
-        '''
-            #print(query_string)
-            #print()
-            label_data = Sparqler().query(query_string) # default to DEFAULT_ENDPOINT
-            #print(json.dumps(label_data, indent=2))
-
-            # Get the label from the query results
-            LABEL[scheme_orientation[button_position]] = label_data[0]['label']['value']
-            #print('label:', LABEL[button_position])
-            #print()
-
-            # Set the button label to the label of the concept, then make the button visible.
-            if button_position == 'left':
-                left_button.config(text='Switch to ' + scheme_orientation['left'] + '\nterm: ' + LABEL[scheme_orientation['left']], command = lambda: change_scheme_button(scheme_orientation['left']))
-                if need_to_display_button:
-                    left_button.grid(column=1, row=2, sticky=W)
-            elif button_position == 'right':
-                right_button.config(text='Switch to ' + scheme_orientation['right'] + '\nterm: ' + LABEL[scheme_orientation['right']], command = lambda: change_scheme_button(scheme_orientation['right']))
-                if need_to_display_button:
-                    right_button.grid(column=3, row=2, sticky=W)
-
-    if not found_match_for_side:
-        # If no match was found, clear the button data.
-        MATCH_TYPE[button_position] = ''
-        CLASSIFICATION[scheme_orientation[button_position]] = ''
-        LABEL[scheme_orientation[button_position]] = ''
-        if button_position == 'left':
-            left_button.grid_forget()
-        elif button_position == 'right':
-            right_button.grid_forget()
+    if verbose:
+        print('Crawl finished:', nodes_done, 'concepts,', len(failed), 'failed,', int(elapsed_time), 's,', round(summary['nodes_per_second'], 2), 'concepts/s')
+    return summary
+
+def visit_for_warm_up(node: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+    """Visit a concept to put the responses to the queries the GUI sends for it into the response cache."""
+    retrieve_label(node['iri'])
+    retrieve_broader_classification(node['iri'])
+    narrower_concepts = retrieve_narrower_concepts(node['scheme'], node['iri'])
+    retrieve_included_artworks(node['scheme'], node['iri'])
+    # The GUI also retrieves the label of the equivalent concept in each other scheme.
+    for scheme, matches in retrieve_equivalents(node['iri']).items():
+        if scheme != node['scheme']:
+            retrieve_label(matches[-1][1])
+    return ({}, narrower_concepts)
+
+# Column headers of the coverage report written by the crawler
+COVERAGE_REPORT_FIELDS = ['scheme', 'depth', 'iri', 'label', 'parent', 'narrower_count', 'artwork_count', 'wikidata_class_count',
+                          'has_crosswalk', 'wikidata_match', 'wikidata_match_type', 'aat_match', 'aat_match_type',
+                          'nomenclature_match', 'nomenclature_match_type']
+
+def visit_for_coverage(node: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+    """Visit a concept for the coverage report, using the same narrower, artworks and crosswalk logic as the GUI."""
+    narrower_concepts = retrieve_narrower_concepts(node['scheme'], node['iri'])
+    artworks = retrieve_included_artworks(node['scheme'], node['iri'])
+    equivalents = retrieve_equivalents(node['iri'])
+
+    row = {'scheme': node['scheme'],
+           'depth': node['depth'],
+           'iri': node['iri'],
+           'label': node['label'],
+           'parent': node['parent'],
+           'narrower_count': len(narrower_concepts),
+           'artwork_count': len(set(artwork['artwork_iri'] for artwork in artworks)),
+           'wikidata_class_count': len(set(artwork['class_iri'] for artwork in artworks)),
+           'has_crosswalk': any(scheme != node['scheme'] for scheme in equivalents)
+        }
+    for scheme in SCHEME_ORIENTATIONS:
+        # As in the GUI, the last match is used if there is more than one.
+        if scheme != node['scheme'] and scheme in equivalents:
+            predicate_iri, concept_iri = equivalents[scheme][-1]
+            row[scheme + '_match'] = concept_iri
+            row[scheme + '_match_type'] = predicate_iri.split('#')[-1]
+        else:
+            row[scheme + '_match'] = ''
+            row[scheme + '_match_type'] = ''
+    return (row, narrower_concepts)
 
 # ------------
 # Classes
@@ -607,8 +1250,10 @@ class Sparqler:
     method: str
         Possible values are "post" (default) or "get". Use "get" if read-only query endpoint.
         Must be "post" for update endpoint.
-    endpoint: URL
-        Defaults to Wikidata Query Service if not provided.
+    endpoint: URL or list of URLs
+        Defaults to ENDPOINTS (set by the --endpoint argument) if not provided.
+        If a list of mirror endpoints is given, queries are routed among them based on their health and
+        latency (see the EndpointPool class). Updates are always sent to the first endpoint in the list.
     useragent : str
         Required if using the Wikidata Query Service, otherwise optional.
         Use the form: appname/v.v (URL; mailto:email@domain.com)
@@ -616,20 +1261,41 @@ class Sparqler:
     session: requests.Session
         If provided, the session will be used for all queries. Note: required for the Commons Query Service.
         If not provided, a generic requests method (get or post) will be used.
-        NOTE: Currently only implemented for the .query() method since I don't have any way to test the mehtods that write.
+        Used by the .query() method and by the methods that write (.update(), .load(), .drop() and the bulk methods).
     sleep: float
         Number of seconds to wait between queries. Defaults to 0.1
+        In the bulk methods, each worker waits this long after each of its requests.
+    hedge_percentile: float
+        When there is more than one endpoint and a query has taken longer than this percentile of the recent
+        latencies of the endpoint it was sent to, a duplicate is sent to the next endpoint and the first response
+        is used. Defaults to HEDGE_PERCENTILE. Use None to turn hedging off.
+    timeout: float
+        Number of seconds to wait for the response to a query before giving up on it. Defaults to QUERY_TIMEOUT.
+        Use None to wait indefinitely. Not applied to updates, since loads can take a long time.
+    use_cache: bool
+        If True (default) and there is a response cache (RESPONSE_CACHE, set by the --cache argument), query
+        responses are looked up in it and successful responses are saved to it. Updates are never cached.
+        Use False for queries whose results must be current, such as the dumps used to build local data.
         
     Required modules:
     -------------
-    requests, datetime, time
+    requests, datetime, time, threading, concurrent.futures
     """
-    def __init__(self, method=DEFAULT_METHOD, endpoint=DEFAULT_ENDPOINT, useragent=None, session=None, sleep=0.1):
+    def __init__(self, method=DEFAULT_METHOD, endpoint=None, useragent=None, session=None, sleep=0.1, hedge_percentile=HEDGE_PERCENTILE, timeout=QUERY_TIMEOUT, use_cache=True):
         # attributes for all methods
         self.http_method = method
-        self.endpoint = endpoint
+        if endpoint is None:
+            endpoint = ENDPOINTS
+        if isinstance(endpoint, str):
+            self.endpoints = [endpoint]
+        else:
+            self.endpoints = list(endpoint)
+        self.endpoint = self.endpoints[0]
+        self.hedge_percentile = hedge_percentile
+        self.timeout = timeout
+        self.use_cache = use_cache
         if useragent is None:
-            if self.endpoint == 'https://query.wikidata.org/sparql':
+            if 'https://query.wikidata.org/sparql' in self.endpoints:
                 print('You must provide a value for the useragent argument when using the Wikidata Query Service.')
                 print()
                 raise KeyboardInterrupt # Use keyboard interrupt instead of sys.exit() because it works in Jupyter notebooks
@@ -683,63 +1349,78 @@ class Sparqler:
         data are sent as a dict with the urlencoded header. 
         See SPARQL 1.1 protocol notes at https://www.w3.org/TR/sparql11-protocol/#query-operation        
         """
-        query_form = form
-        if 'mediatype' in kwargs:
-            media_type = kwargs['mediatype']
-        else:
-            if query_form == 'construct' or query_form == 'describe':
-            #if query_form == 'construct':
-                media_type = 'text/turtle'
+        # The first line of the query after the prefixes identifies it in traces.
+        query_name = query_string[max(query_string.find(form.upper()), 0):].split('\n')[0][:80]
+        with TRACER.span('Sparqler.query', query=query_name):
+            query_form = form
+            if 'mediatype' in kwargs:
+                media_type = kwargs['mediatype']
             else:
-                media_type = 'application/sparql-results+json' # default for SELECT and ASK query forms
-        self.requestheader['Accept'] = media_type
+                if query_form == 'construct' or query_form == 'describe':
+                #if query_form == 'construct':
+                    media_type = 'text/turtle'
+                else:
+                    media_type = 'application/sparql-results+json' # default for SELECT and ASK query forms
+            self.requestheader['Accept'] = media_type
             
-        # Build the payload dictionary (query and graph data) to be sent to the endpoint
-        payload = {'query' : query_string}
-        if 'default' in kwargs:
-            payload['default-graph-uri'] = kwargs['default']
+            # Build the payload dictionary (query and graph data) to be sent to the endpoint
+            payload = {'query' : query_string}
+            if 'default' in kwargs:
+                payload['default-graph-uri'] = kwargs['default']
         
-        if 'named' in kwargs:
-            payload['named-graph-uri'] = kwargs['named']
-
-        if verbose:
-            print('querying SPARQL endpoint')
-
-        start_time = datetime.datetime.now()
-        if self.http_method == 'post':
-            if self.session is None:
-                response = requests.post(self.endpoint, data=payload, headers=self.requestheader)
-            else:
-                response = self.session.post(self.endpoint, data=payload, headers=self.requestheader)
-        else:
-            if self.session is None:
-                response = requests.get(self.endpoint, params=payload, headers=self.requestheader)
+            if 'named' in kwargs:
+                payload['named-graph-uri'] = kwargs['named']
+
+            if verbose:
+                print('querying SPARQL endpoint')
+
+            start_time = datetime.datetime.now()
+            # The mirror endpoints serve the same data, so the cache key doesn't include the endpoint.
+            cache = RESPONSE_CACHE if self.use_cache else None
+            if cache is not None:
+                cache_key = cache.key(payload, media_type)
+                response_text = cache.get(cache_key)
             else:
-                response = self.session.get(self.endpoint, params=payload, headers=self.requestheader)
-        elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
-        self.response = response.text
-        time.sleep(self.sleep) # Throttle as a courtesy to avoid hitting the endpoint too fast.
+                response_text = None
 
-        if verbose:
-            print('done retrieving data in', int(elapsed_time), 's')
+            if response_text is None:
+                if len(self.endpoints) == 1:
+                    with TRACER.span('http request', endpoint=self.endpoint):
+                        response = self._send_query(self.endpoint, payload, self.requestheader)
+                else:
+                    with TRACER.span('http request (routed)', endpoints=len(self.endpoints)):
+                        response = self._send_routed_query(payload)
+                response_text = response.text
+                if cache is not None and response.ok:
+                    cache.put(cache_key, response_text)
+                with TRACER.span('sleep', seconds=self.sleep):
+                    time.sleep(self.sleep) # Throttle as a courtesy to avoid hitting the endpoint too fast.
+            elif verbose:
+                print('using cached response')
+            elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
+            self.response = response_text
+
+            if verbose:
+                print('done retrieving data in', int(elapsed_time), 's')
 
-        if query_form == 'construct' or query_form == 'describe':
-            return response.text
-        else:
-            if media_type != 'application/sparql-results+json':
-                return response.text
+            if query_form == 'construct' or query_form == 'describe':
+                return response_text
             else:
-                try:
-                    data = response.json()
-                except:
-                    return None # Returns no value if an error. 
-
-                if query_form == 'select':
-                    # Extract the values from the response JSON
-                    results = data['results']['bindings']
+                if media_type != 'application/sparql-results+json':
+                    return response_text
                 else:
-                    results = data['boolean'] # True or False result from ASK query 
-                return results           
+                    try:
+                        with TRACER.span('parse json', characters=len(response_text)):
+                            data = json.loads(response_text)
+                    except:
+                        return None # Returns no value if an error. 
+
+                    if query_form == 'select':
+                        # Extract the values from the response JSON
+                        results = data['results']['bindings']
+                    else:
+                        results = data['boolean'] # True or False result from ASK query 
+                    return results           
 
     def update(self, request_string, mediatype='application/json', verbose=False, **kwargs):
         """Sends a SPARQL update to the endpoint.
@@ -776,7 +1457,7 @@ class Sparqler:
             print('beginning update')
             
         start_time = datetime.datetime.now()
-        response = requests.post(self.endpoint, data=payload, headers=self.requestheader)
+        response = self._post_update(payload, self.requestheader)
         elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
         self.response = response.text
         time.sleep(self.sleep) # Throttle as a courtesy to avoid hitting the endpoint too fast.
@@ -833,7 +1514,1562 @@ class Sparqler:
             print('Deleting graph:', graph_uri)
         data = self.update(request_string, verbose=verbose)
         return data
-    
+
+    def count_triples(self, graph_uri):
+        """Count the triples in a specified graph. Returns None if the count could not be retrieved.
+        The count is sent only to the endpoint that receives updates, since a mirror may not have the latest updates yet,
+        and is never cached, since the graph changes between the counts before and after a load."""
+        query_string = 'SELECT (COUNT(*) AS ?count) WHERE { GRAPH <' + graph_uri + '> { ?s ?p ?o } }'
+        counter = Sparqler(method=self.http_method, endpoint=self.endpoint, useragent=self.requestheader.get('User-Agent'), session=self.session,
+                           sleep=self.sleep, timeout=self.timeout, use_cache=False)
+        data = counter.query(query_string)
+        if not data:
+            return None
+        return int(data[0]['count']['value'])
+
+    def insert_data_chunked(self, triples, graph_uri, max_chunk_bytes=1000000, max_workers=1, retries=3, retry_wait=1.0, timeout=600, verbose=False):
+        """Inserts a large set of triples into a graph as a series of size-bounded INSERT DATA requests.
+
+        Parameters
+        ----------
+        triples : str or list of str
+            The triples to insert, serialized as N-Triples (one complete triple per line, ending with " .").
+            Blank lines and comment lines are skipped.
+        graph_uri : str
+            IRI of the graph into which the triples will be inserted.
+        max_chunk_bytes : int
+            Upper limit on the size (in UTF-8 bytes) of the triples sent in a single request. Defaults to 1000000.
+            A triple larger than the limit is sent in a chunk by itself. Triples that share a blank node are
+            always sent in the same chunk, even if it exceeds the limit, since each request creates its own blank nodes.
+        max_workers : int
+            Number of chunks that may be sent at the same time. Defaults to 1 (one chunk after another).
+        retries : int
+            Number of times a failed chunk is resent before it is given up on. Defaults to 3. Chunks containing
+            blank nodes are never resent, since a chunk that timed out may have been inserted, and inserting it
+            again would create duplicate blank nodes.
+        retry_wait : float
+            Seconds to wait before the first retry of a chunk. The wait doubles with each further retry.
+        timeout : float
+            Number of seconds to wait for the response to a chunk before counting it as failed. Defaults to 600.
+            Use None to wait indefinitely.
+        verbose: bool
+            Prints progress when True. Defaults to False.
+
+        Returns
+        -------
+        A dictionary summarizing the job. See .run_bulk_updates() for the keys.
+        """
+        if isinstance(triples, str):
+            triples = triples.splitlines()
+        triples = [triple.strip() for triple in triples if triple.strip() != '' and not triple.strip().startswith('#')]
+
+        # Put triples that share blank node labels into the same group, using a union-find over the triples.
+        # Literals are removed before looking for labels, since they may contain text like "_:x".
+        group_of = list(range(len(triples)))
+        def find_group(index):
+            while group_of[index] != index:
+                group_of[index] = group_of[group_of[index]]
+                index = group_of[index]
+            return index
+        first_use = {}
+        has_blank_node = [False] * len(triples)
+        for index, triple in enumerate(triples):
+            for label in re.findall(r'_:[\w-]+(?:\.[\w-]+)*', re.sub(r'"(?:[^"\\]|\\.)*"', '', triple)):
+                has_blank_node[index] = True
+                if label in first_use:
+                    group_of[find_group(index)] = find_group(first_use[label])
+                else:
+                    first_use[label] = index
+        groups = {}
+        for index in range(len(triples)):
+            groups.setdefault(find_group(index), []).append(index)
+
+        # Pack the groups, in the order of their first triples, into chunks whose size doesn't exceed max_chunk_bytes.
+        chunks = []
+        chunk = []
+        chunk_bytes = 0
+        for group in groups.values():
+            group_bytes = sum(len(triples[index].encode('utf-8')) + 1 for index in group) # Include the newline that separates the triples.
+            if chunk and chunk_bytes + group_bytes > max_chunk_bytes:
+                chunks.append(chunk)
+                chunk = []
+                chunk_bytes = 0
+            chunk += group
+            chunk_bytes += group_bytes
+        if chunk:
+            chunks.append(chunk)
+
+        request_strings = ['INSERT DATA { GRAPH <' + graph_uri + '> {\n' + '\n'.join(triples[index] for index in chunk) + '\n} }' for chunk in chunks]
+        triple_counts = [len(chunk) for chunk in chunks]
+        names = ['chunk ' + str(index + 1) + ' of ' + str(len(chunks)) for index in range(len(chunks))]
+        retryable = [not any(has_blank_node[index] for index in chunk) for chunk in chunks]
+
+        if verbose:
+            print('Inserting', sum(triple_counts), 'triples into graph:', graph_uri, 'in', len(chunks), 'chunks')
+        return self.run_bulk_updates(request_strings, triple_counts=triple_counts, names=names, max_workers=max_workers, retries=retries,
+                                     retry_wait=retry_wait, retryable=retryable, timeout=timeout, verbose=verbose)
+
+    def load_many(self, files, max_workers=4, s3='', count_triples=False, retries=3, retry_wait=1.0, timeout=3600, verbose=False):
+        """Loads several RDF documents into their graphs, running a limited number of loads at the same time.
+
+        Parameters
+        ----------
+        files : dict or list of tuples
+            The files to load, either as a dictionary of {file_location: graph_uri} or as a list of
+            (file_location, graph_uri) tuples. Several files may be loaded into the same graph.
+        max_workers : int
+            Number of loads that may be running at the same time. Defaults to 4.
+        s3 : str
+            Name of an AWS S3 bucket containing the files. Omit to load generic URLs.
+        count_triples : bool
+            When True, the triples in each target graph are counted before and after loading, so that the
+            number of triples loaded and the triples per second can be reported. Defaults to False.
+        retries : int
+            Number of times a failed load is resent before it is given up on. Defaults to 3.
+        retry_wait : float
+            Seconds to wait before the first retry of a load. The wait doubles with each further retry.
+        timeout : float
+            Number of seconds to wait for the response to a load before counting it as failed. Defaults to 3600.
+            Use None to wait indefinitely.
+        verbose: bool
+            Prints progress when True. Defaults to False.
+
+        Returns
+        -------
+        A dictionary summarizing the job. See .run_bulk_updates() for the keys.
+        """
+        if isinstance(files, dict):
+            files = list(files.items())
+
+        request_strings = []
+        for file_location, graph_uri in files:
+            if s3:
+                request_strings.append('LOAD <https://' + s3 + '.s3.amazonaws.com/' + file_location + '> INTO GRAPH <' + graph_uri + '>')
+            else:
+                request_strings.append('LOAD <' + file_location + '> INTO GRAPH <' + graph_uri + '>')
+        names = [file_location for file_location, graph_uri in files]
+
+        graph_uris = list(dict.fromkeys([graph_uri for file_location, graph_uri in files]))
+        if count_triples:
+            counts_before = {graph_uri: self.count_triples(graph_uri) for graph_uri in graph_uris}
+
+        if verbose:
+            print('Loading', len(files), 'files into', len(graph_uris), 'graphs with up to', max_workers, 'loads at a time')
+        summary = self.run_bulk_updates(request_strings, names=names, max_workers=max_workers, retries=retries, retry_wait=retry_wait, timeout=timeout, verbose=verbose)
+
+        if count_triples:
+            # The number of triples in each file isn't known in advance, so use the change in the size of the graphs.
+            triples_loaded = 0
+            for graph_uri in graph_uris:
+                count_after = self.count_triples(graph_uri)
+                if counts_before[graph_uri] is not None and count_after is not None:
+                    triples_loaded += count_after - counts_before[graph_uri]
+            summary['triples'] = triples_loaded
+            if summary['elapsed'] > 0:
+                summary['triples_per_second'] = triples_loaded / summary['elapsed']
+            if verbose:
+                print(triples_loaded, 'triples loaded,', round(summary['triples_per_second'], 1), 'triples/s')
+        return summary
+
+    def run_bulk_updates(self, request_strings, triple_counts=None, names=None, max_workers=1, retries=3, retry_wait=1.0, retryable=None, timeout=600, verbose=False):
+        """Sends a list of SPARQL update requests, running a limited number at the same time and retrying failures.
+
+        Parameters
+        ----------
+        request_strings : list of str
+            The update requests to be sent.
+        triple_counts : list of int
+            Number of triples written by each request, used to report triples per second. Optional.
+        names : list of str
+            Names used to identify each request in progress messages and in the summary. Optional.
+        max_workers : int
+            Number of requests that may be running at the same time. Defaults to 1.
+        retries : int
+            Number of times a failed request is resent before it is given up on. Defaults to 3.
+        retry_wait : float
+            Seconds to wait before the first retry of a request. The wait doubles with each further retry.
+        retryable : list of bool
+            Whether each request may be resent after it fails. Optional, all requests are resent by default.
+            A request that timed out may still have been applied, so requests that aren't safe to repeat shouldn't be resent.
+        timeout : float
+            Number of seconds to wait for the response to each request before counting it as failed. Defaults to 600.
+            Use None to wait indefinitely.
+        verbose: bool
+            Prints progress when True. Defaults to False.
+
+        Returns
+        -------
+        A dictionary with the keys "requests" (number sent), "succeeded" (number that succeeded), "failed" (list of
+        names of the requests that failed after all retries), "triples" (triples written by successful requests),
+        "elapsed" (seconds) and "triples_per_second".
+        """
+        if triple_counts is None:
+            triple_counts = [0] * len(request_strings)
+        if names is None:
+            names = ['request ' + str(index + 1) for index in range(len(request_strings))]
+        if retryable is None:
+            retryable = [True] * len(request_strings)
+
+        # Use a copy of the headers, since the workers share them and .update() changes the Accept header.
+        headers = dict(self.requestheader)
+        headers['Accept'] = 'application/json'
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        lock = threading.Lock()
+        progress = {'done': 0, 'succeeded': 0, 'triples': 0, 'failed': []}
+        start_time = datetime.datetime.now()
+
+        def send_request(index):
+            payload = {'update': request_strings[index]}
+            succeeded = False
+            for attempt in range(retries + 1 if retryable[index] else 1):
+                if attempt > 0:
+                    time.sleep(retry_wait * 2 ** (attempt - 1)) # Back off before retrying.
+                try:
+                    response = self._post_update(payload, headers, timeout=timeout)
+                    succeeded = response.ok
+                except requests.exceptions.RequestException:
+                    succeeded = False
+                time.sleep(self.sleep) # Throttle as a courtesy to avoid hitting the endpoint too fast.
+                if succeeded:
+                    break
+                if verbose:
+                    print('Attempt', attempt + 1, 'failed for', names[index])
+
+            with lock:
+                progress['done'] += 1
+                if succeeded:
+                    progress['succeeded'] += 1
+                    progress['triples'] += triple_counts[index]
+                else:
+                    progress['failed'].append(names[index])
+                if verbose:
+                    elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
+                    message = str(progress['done']) + '/' + str(len(request_strings)) + ' done (' + names[index] + ')'
+                    if progress['triples'] > 0 and elapsed_time > 0:
+                        message += ', ' + str(progress['triples']) + ' triples, ' + str(round(progress['triples'] / elapsed_time, 1)) + ' triples/s'
+                    print(message)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Use list() so that any unexpected exception raised by a worker is raised here.
+            list(executor.map(send_request, range(len(request_strings))))
+
+        elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
+        summary = {'requests': len(request_strings),
+                   'succeeded': progress['succeeded'],
+                   'failed': progress['failed'],
+                   'triples': progress['triples'],
+                   'elapsed': elapsed_time,
+                   'triples_per_second': progress['triples'] / elapsed_time if elapsed_time > 0 else 0.0
+            }
+        if verbose:
+            print('done:', summary['succeeded'], 'of', summary['requests'], 'requests succeeded in', int(elapsed_time), 's')
+            if summary['failed']:
+                print('failed:', ', '.join(summary['failed']))
+        return summary
+
+    def _post_update(self, payload, headers, timeout=None):
+        """Sends an update payload using the session if there is one, otherwise a generic requests.post.
+        By default there is no timeout, since a single update or load can take a long time."""
+        if self.session is None:
+            return requests.post(self.endpoint, data=payload, headers=headers, timeout=timeout)
+        else:
+            return self.session.post(self.endpoint, data=payload, headers=headers, timeout=timeout)
+
+    def _send_query(self, endpoint, payload, headers):
+        """Sends a query payload to one endpoint using the session if there is one, otherwise a generic requests method."""
+        if self.http_method == 'post':
+            if self.session is None:
+                return requests.post(endpoint, data=payload, headers=headers, timeout=self.timeout)
+            else:
+                return self.session.post(endpoint, data=payload, headers=headers, timeout=self.timeout)
+        else:
+            if self.session is None:
+                return requests.get(endpoint, params=payload, headers=headers, timeout=self.timeout)
+            else:
+                return self.session.get(endpoint, params=payload, headers=headers, timeout=self.timeout)
+
+    def _send_routed_query(self, payload):
+        """Sends a query payload to the healthiest of several mirror endpoints, with hedging and failover.
+
+        The query goes to the endpoint ranked first by the EndpointPool. If it hasn't answered within the
+        hedge_percentile latency of that endpoint, a duplicate is sent to the next endpoint and whichever
+        answers first is used. If an endpoint fails, the query fails over to the next one.
+
+        Notes
+        -----
+        A request that has already been sent can't be aborted by the requests module, so the losing request
+        of a hedged pair is cancelled only if it hasn't started yet. Otherwise its response is discarded.
+        """
+        pool = EndpointPool.for_endpoints(self.endpoints)
+        headers = dict(self.requestheader) # Copy, since the workers of the pool use the headers.
+        candidates = pool.ranked()
+        outstanding = {} # Futures of requests in progress, with their endpoints
+        last_response = None
+        last_error = None
+
+        while candidates or outstanding:
+            hedge_delay = None
+            if not outstanding: # Start with (or fail over to) the next endpoint.
+                endpoint = candidates.pop(0)
+                outstanding[pool.submit(self._send_query, endpoint, payload, headers)] = endpoint
+                if candidates and self.hedge_percentile is not None:
+                    hedge_delay = pool.latency_percentile(endpoint, self.hedge_percentile)
+
+            done, not_done = wait(outstanding, timeout=hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # The endpoint is slower than usual, so send a hedged duplicate to the next endpoint.
+                endpoint = candidates.pop(0)
+                outstanding[pool.submit(self._send_query, endpoint, payload, headers)] = endpoint
+                continue
+
+            for future in done:
+                outstanding.pop(future)
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as error:
+                    last_error = error
+                    continue
+                if response.status_code >= 500:
+                    last_response = response
+                    continue
+                # The first good response wins. Cancel the other requests or ignore their responses.
+                for loser in outstanding:
+                    loser.cancel()
+                return response
+
+        # Every endpoint failed. Return the last error response the way a single endpoint would, or raise the last error.
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+
+class EndpointPool:
+    """Track the health and latency of a set of mirror SPARQL endpoints that serve the same data.
+
+    There is one pool for each set of endpoints, shared by all Sparqler objects that use that set, so that
+    what is learned about the endpoints persists between queries. Get it with EndpointPool.for_endpoints().
+
+    Parameters
+    -----------
+    endpoints: list of URLs
+        The mirror endpoints.
+    history: int
+        Number of recent latencies kept for each endpoint. Defaults to 50.
+    min_samples: int
+        Number of latencies needed before an endpoint's latency percentile is used for hedging. Defaults to 5.
+    max_failures: int
+        Number of failures in a row after which an endpoint is marked down. Defaults to 3.
+    down_seconds: float
+        Number of seconds an endpoint stays marked down before it is tried again. Defaults to 30.
+    """
+    pools = {} # The shared pools, keyed by the tuple of their endpoints
+    pools_lock = threading.Lock()
+
+    def __init__(self, endpoints, history=50, min_samples=5, max_failures=3, down_seconds=30.0):
+        self.endpoints = list(endpoints)
+        self.min_samples = min_samples
+        self.max_failures = max_failures
+        self.down_seconds = down_seconds
+        self.lock = threading.Lock()
+        self.latencies = {endpoint: deque(maxlen=history) for endpoint in self.endpoints}
+        self.failures = {endpoint: 0 for endpoint in self.endpoints}
+        self.down_until = {endpoint: 0.0 for endpoint in self.endpoints}
+        # Allow room for abandoned hedged requests that are still running.
+        self.executor = ThreadPoolExecutor(max_workers=4 * len(self.endpoints))
+
+    @classmethod
+    def for_endpoints(cls, endpoints):
+        """Return the shared pool for a list of endpoints, creating it if necessary."""
+        key = tuple(endpoints)
+        with cls.pools_lock:
+            if key not in cls.pools:
+                cls.pools[key] = cls(endpoints)
+            return cls.pools[key]
+
+    def ranked(self) -> List[str]:
+        """Return the endpoints in the order they should be tried.
+
+        Healthy endpoints come first, fastest (by median recent latency) first. Endpoints that haven't been
+        used yet count as fastest so that they get tried. Endpoints that are marked down come last, as a
+        last resort, with the one that will recover soonest first.
+        """
+        now = time.monotonic()
+        with self.lock:
+            healthy = [endpoint for endpoint in self.endpoints if self.down_until[endpoint] <= now]
+            down = [endpoint for endpoint in self.endpoints if self.down_until[endpoint] > now]
+            healthy.sort(key=lambda endpoint: self._percentile(endpoint, 50) or 0.0)
+            down.sort(key=lambda endpoint: self.down_until[endpoint])
+        return healthy + down
+
+    def latency_percentile(self, endpoint: str, percentile: float) -> Optional[float]:
+        """Return a percentile of the recent latencies of an endpoint, or None if there aren't enough of them."""
+        with self.lock:
+            if len(self.latencies[endpoint]) < self.min_samples:
+                return None
+            return self._percentile(endpoint, percentile)
+
+    def _percentile(self, endpoint, percentile):
+        latencies = sorted(self.latencies[endpoint])
+        if not latencies:
+            return None
+        return latencies[int(round(percentile / 100 * (len(latencies) - 1)))]
+
+    def submit(self, send_function, endpoint, *args):
+        """Run send_function(endpoint, *args) in the pool's threads, recording the latency or failure of the endpoint.
+        Returns a Future."""
+        def timed_send():
+            start_time = time.monotonic()
+            try:
+                response = send_function(endpoint, *args)
+            except requests.exceptions.RequestException:
+                self.record_failure(endpoint)
+                raise
+            if response.status_code >= 500:
+                self.record_failure(endpoint)
+            else:
+                self.record_success(endpoint, time.monotonic() - start_time)
+            return response
+        return self.executor.submit(timed_send)
+
+    def record_success(self, endpoint: str, latency: float) -> None:
+        """Record the latency of a successful request and mark the endpoint healthy."""
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.failures[endpoint] = 0
+            self.down_until[endpoint] = 0.0
+
+    def record_failure(self, endpoint: str) -> None:
+        """Record a failed request and mark the endpoint down if it has failed too many times in a row."""
+        with self.lock:
+            self.failures[endpoint] += 1
+            if self.failures[endpoint] >= self.max_failures:
+                self.down_until[endpoint] = time.monotonic() + self.down_seconds
+                print('Endpoint marked down for', self.down_seconds, 's:', endpoint)
+
+
+class Tracer:
+    """Opt-in hierarchical tracing of GUI actions down to individual queries, saved as a Chrome trace.
+
+    Spans are recorded as Chrome trace "complete" events. Spans that are opened inside another span on the
+    same thread are nested under it in the trace viewer. Flow events link the click that starts a navigation,
+    the worker thread that builds its view and the rendering of the view, which happen on different threads.
+    When tracing isn't enabled, the methods do nothing.
+
+    Parameters
+    -----------
+    enabled: bool
+        Record spans when True. Defaults to False.
+    profile_dir: str
+        If provided, each action run inside .profile() is profiled with cProfile and the statistics are saved
+        in this directory as <number>_<action>.prof (view them with pstats or snakeviz).
+    """
+    def __init__(self, enabled=False, profile_dir=''):
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.events = []
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.profile_count = 0
+        self.named_threads = set()
+
+    def _timestamp(self):
+        """Microseconds since the tracer was created, as Chrome trace events require."""
+        return (time.perf_counter() - self.start_time) * 1000000
+
+    def _add_event(self, event):
+        thread_id = threading.get_ident()
+        event['pid'] = os.getpid()
+        event['tid'] = thread_id
+        with self.lock:
+            if thread_id not in self.named_threads: # Label each thread's row in the viewer.
+                self.named_threads.add(thread_id)
+                self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': event['pid'], 'tid': thread_id, 'args': {'name': threading.current_thread().name}})
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, **args):
+        """Record the time spent in a with block as a span. Keyword arguments are shown with the span."""
+        if not self.enabled:
+            yield
+            return
+        start = self._timestamp()
+        try:
+            yield
+        finally:
+            self._add_event({'name': name, 'cat': 'action', 'ph': 'X', 'ts': start, 'dur': self._timestamp() - start, 'args': args})
+
+    def flow(self, flow_id, phase):
+        """Record a step of a flow that links spans on different threads.
+        phase is 's' for the start, 't' for a step and 'f' for the finish. It is bound to the enclosing span."""
+        if self.enabled:
+            self._add_event({'name': 'navigation', 'cat': 'navigation', 'ph': phase, 'id': flow_id, 'ts': self._timestamp(), 'bp': 'e'})
+
+    @contextmanager
+    def profile(self, name):
+        """Profile a with block with cProfile if a profile directory was provided."""
+        if not self.profile_dir:
+            yield
+            return
+        with self.lock:
+            self.profile_count += 1
+            path = os.path.join(self.profile_dir, str(self.profile_count).zfill(4) + '_' + name + '.prof')
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError: # Another profiler is already running in this process (Python 3.12 and later).
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+
+    def save(self, path: str) -> None:
+        """Save the recorded events as a Chrome trace JSON file."""
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'wt', encoding='utf-8') as file_object:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file_object)
+        print('Trace with', len(events), 'events saved to', path)
+
+
+class NavigationSuperseded(Exception):
+    """Raised in a navigation's worker thread to stop it when a newer navigation has started."""
+    pass
+
+
+class ConceptSearchIndex:
+    """Local type-ahead search of the labels of the concepts in all three schemes.
+
+    The labels are downloaded in bulk with .build() and saved to disk with .save() together with the index,
+    so loading it doesn't tokenize or sort anything. The entries are kept in ranking order (shorter labels
+    first, then alphabetical), so an entry's number is also its rank. The index has:
+
+    - a sorted list of the words of all labels and, for each word, the numbers of the entries that have it,
+      so the entries with a word starting with a prefix are found by binary search
+    - for every prefix of up to SHORT_PREFIX characters, the numbers of the entries with a word starting with
+      it, since those prefixes match too many words to merge their lists while typing
+    - the entry numbers in order of their normalized labels, so the labels starting with the search text
+      are found by binary search
+
+    Parameters
+    -----------
+    entries: list of tuples
+        The (IRI, label, scheme) of each concept.
+    index: dict
+        The index saved by .save() for these entries, which must be in ranking order. Built if omitted.
+    """
+    SHORT_PREFIX = 2
+
+    def __init__(self, entries, index=None):
+        if index is None:
+            self.entries = sorted(set(tuple(entry) for entry in entries), key=lambda entry: (len(entry[1]), entry[1].lower(), entry))
+            index = self.build_index(self.entries)
+        else:
+            self.entries = [tuple(entry) for entry in entries]
+        self.normalized_labels = index['normalized_labels']
+        self.words = index['words']
+        self.postings = index['postings']
+        self.prefix_postings = index['prefix_postings']
+        self.label_order = index['label_order']
+        self.label_keys = [self.normalized_labels[entry_number] for entry_number in self.label_order] # For bisect, which can't use a key function before Python 3.10
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Split text into lower case words."""
+        return re.findall(r'\w+', text.lower())
+
+    @classmethod
+    def build_index(cls, entries) -> Dict[str, Any]:
+        """Build the index of entries that are in ranking order."""
+        normalized_labels = [' '.join(cls.tokenize(label)) for iri, label, scheme in entries]
+        word_entries = {}
+        prefix_entries = {}
+        for entry_number, normalized_label in enumerate(normalized_labels):
+            for word in set(normalized_label.split()):
+                word_entries.setdefault(word, []).append(entry_number) # Entry numbers are added in order, so the lists are sorted.
+                for length in range(1, cls.SHORT_PREFIX + 1):
+                    prefix_entries.setdefault(word[:length], set()).add(entry_number)
+        words = sorted(word_entries)
+        return {'normalized_labels': normalized_labels,
+                'words': words,
+                'postings': [word_entries[word] for word in words],
+                'prefix_postings': {prefix: sorted(entry_numbers) for prefix, entry_numbers in prefix_entries.items()},
+                'label_order': sorted(range(len(entries)), key=normalized_labels.__getitem__)
+            }
+
+    @classmethod
+    def build(cls, verbose=False):
+        """Create an index by downloading the labels of all concepts linked to artworks in the three schemes."""
+        entries = []
+        for scheme in SCHEME_ORIENTATIONS:
+            start_time = datetime.datetime.now()
+            concepts = retrieve_label_dump(scheme)
+            entries += [(concept['iri'], concept['label'], scheme) for concept in concepts]
+            if verbose:
+                print(scheme + ':', len(concepts), 'labels retrieved in', int((datetime.datetime.now() - start_time).total_seconds()), 's')
+        return cls(entries)
+
+    @classmethod
+    def load(cls, path: str):
+        """Load an index saved with .save(). Files saved before the index was included are indexed when they are loaded."""
+        with open(path, 'rt', encoding='utf-8') as file_object:
+            data = json.load(file_object)
+        return cls(data['entries'], data.get('index'))
+
+    def save(self, path: str) -> None:
+        """Save the concepts of the index and the index as a JSON file."""
+        index = {'normalized_labels': self.normalized_labels,
+                 'words': self.words,
+                 'postings': self.postings,
+                 'prefix_postings': self.prefix_postings,
+                 'label_order': self.label_order
+            }
+        with open(path, 'wt', encoding='utf-8') as file_object:
+            json.dump({'built': datetime.datetime.now().isoformat(), 'entries': self.entries, 'index': index}, file_object, ensure_ascii=False)
+
+    def word_postings(self, prefix: str) -> List[int]:
+        """Return the numbers, in ranking order, of the entries with a word starting with prefix."""
+        if len(prefix) <= self.SHORT_PREFIX:
+            return self.prefix_postings.get(prefix, [])
+        first = bisect.bisect_left(self.words, prefix)
+        last = bisect.bisect_left(self.words, prefix + '\U0010ffff', first)
+        if last - first == 1:
+            return self.postings[first]
+        return sorted(set().union(*self.postings[first:last]))
+
+    def search(self, text: str, limit=10) -> List[Tuple[str, str, str]]:
+        """Return up to limit (IRI, label, scheme) tuples for concepts whose labels have a word starting with each word of text.
+
+        Labels that start with the text come first, then shorter labels.
+        """
+        query_words = self.tokenize(text)
+        if not query_words:
+            return []
+        normalized_text = ' '.join(query_words)
+
+        # The labels that start with the text are a range of label_order. If there aren't many, rank them all.
+        first = bisect.bisect_left(self.label_keys, normalized_text)
+        last = bisect.bisect_left(self.label_keys, normalized_text + '\U0010ffff', first)
+        starting_needed = min(last - first, limit)
+        if last - first <= 1000:
+            starting = sorted(self.label_order[first:last])[:limit]
+        else:
+            starting = None # Found in the loop below, where they are common.
+
+        # Go through the entries that have a word starting with each query word in ranking order, so the loop can
+        # stop as soon as it has found the best matches. The labels starting with the text are among them.
+        word_postings = sorted((self.word_postings(query_word) for query_word in set(query_words)), key=len)
+        if len(word_postings) == 1:
+            postings = word_postings[0]
+        else:
+            postings = sorted(set(word_postings[0]).intersection(*word_postings[1:]))
+        found_starting = [] if starting is None else starting
+        others = []
+        others_needed = limit - starting_needed
+        for entry_number in postings:
+            if len(found_starting) >= starting_needed and len(others) >= others_needed:
+                break
+            normalized_label = self.normalized_labels[entry_number]
+            if normalized_label.startswith(normalized_text):
+                if starting is None:
+                    found_starting.append(entry_number)
+                continue
+            if len(others) < others_needed:
+                others.append(entry_number)
+        return [self.entries[entry_number] for entry_number in (found_starting[:starting_needed] + others)[:limit]]
+
+
+class CrosswalkIndex:
+    """In-memory copy of the crosswalk graph, so that equivalent concepts are found by dictionary lookup.
+
+    The graph is small and curated, so all of its triples are loaded with one query. They are indexed by
+    subject: .forward[subject IRI][scheme of object] is a list of (predicate IRI, object IRI) pairs.
+
+    Parameters
+    -----------
+    graph_uri: str
+        IRI of the crosswalk graph. Defaults to CROSSWALK_GRAPH.
+    lazy: bool
+        If True, the graph is loaded the first time it is needed rather than when the index is created.
+    """
+    def __init__(self, graph_uri=CROSSWALK_GRAPH, lazy=False):
+        self.graph_uri = graph_uri
+        self.lock = threading.Lock()
+        self.forward = None
+        self.loaded = None # When the graph was last loaded
+        if not lazy:
+            self.refresh()
+
+    def refresh(self, verbose=False) -> None:
+        """Load (or reload) the whole crosswalk graph and replace the index."""
+        start_time = datetime.datetime.now()
+        query_string = '''SELECT DISTINCT ?s ?p ?o
+FROM <''' + self.graph_uri + '''>
+WHERE {
+?s ?p ?o.
+filter(isIRI(?o))
+}
+'''
+        data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS; not cached, so a refresh gets the current graph
+        forward = {}
+        for result in data:
+            subject_iri = result['s']['value']
+            predicate_iri = result['p']['value']
+            object_iri = result['o']['value']
+            for scheme, pairs in group_equivalents([(predicate_iri, object_iri)]).items():
+                forward.setdefault(subject_iri, {}).setdefault(scheme, []).extend(pairs)
+
+        # Replace the dictionary at once so lookups in other threads never see a partly built index.
+        with self.lock:
+            self.forward = forward
+            self.loaded = datetime.datetime.now()
+        if verbose:
+            print('Loaded', len(data), 'crosswalk triples in', round((self.loaded - start_time).total_seconds(), 1), 's')
+
+    def ensure_loaded(self) -> None:
+        """Load the graph if it hasn't been loaded yet."""
+        if self.forward is None:
+            with self.lock:
+                needs_loading = self.forward is None
+            if needs_loading:
+                self.refresh()
+
+    def equivalents(self, concept_iri: str) -> Dict[str, List[Tuple[str, str]]]:
+        """Return the concepts that the concept links to in the crosswalk graph, as (predicate IRI, concept IRI)
+        pairs grouped by scheme. This is the same information as the crosswalk query in retrieve_equivalents()."""
+        self.ensure_loaded()
+        return self.forward.get(concept_iri, {})
+
+
+class ConceptSnapshot:
+    """Read-only snapshot of the concept graph in a binary file that is opened with mmap, so navigation doesn't need the endpoint.
+
+    The file starts with an 8 byte magic number, the length of a JSON header and the header, which lists the
+    offset, length and array type code of each section. The sections follow, each aligned to 8 bytes:
+
+    - a string table of every IRI in sorted order, so an IRI's number is found by binary search, and the
+      English label for each IRI number. Each is stored as UTF-8 text with an array of offsets into it.
+    - the narrower and broader concepts of each concept, for the relationship used by its scheme (wdt:P279,
+      gvp:broaderPreferred or skos:broader), in compressed sparse row (CSR) form: the neighbours of IRI
+      number i are neighbours[index[i]:index[i + 1]].
+    - in the same form, the crosswalk pairs of each concept, the Wikidata classes matched to each AAT and
+      Nomenclature concept, and the artworks that are instances of each Wikidata class.
+    - a byte for each IRI number with a bit (COVERED_BITS) for each scheme in which the IRI is a concept
+      linked to at least one artwork. The snapshot has complete data only for those concepts, so lookups of
+      any other IRI (for example a crosswalk match with no artworks) return None and the caller sends a query.
+
+    Opening a snapshot reads only the header. The sections are memoryviews of the mapped file, so pages are
+    read from disk when they are first used, and processes that open the same file share them.
+
+    Parameters
+    -----------
+    path: str
+        Path (including filename) of a snapshot saved with .build().
+    """
+    MAGIC = b'CLSNAP02'
+    RELATIONS = {'wikidata': 'http://www.wikidata.org/prop/direct/P279',
+                 'aat': 'http://vocab.getty.edu/ontology#broaderPreferred',
+                 'nomenclature': 'http://www.w3.org/2004/02/skos/core#broader'}
+    COVERED_BITS = {'wikidata': 1, 'aat': 2, 'nomenclature': 4}
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file_object:
+            # The mapping stays valid after the file is closed.
+            self.map = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:8] != self.MAGIC:
+            raise ValueError(path + ' is not a concept snapshot, or was saved by an older version. Run with --build-snapshot')
+        header_length = struct.unpack_from('<Q', self.map, 8)[0]
+        header = json.loads(self.map[16:16 + header_length].decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(path + ' was built on a computer with a different byte order')
+        self.built = header['built']
+        data_start = self._align(16 + header_length)
+        buffer = memoryview(self.map)
+        self.sections = {}
+        for name, (offset, length, typecode) in header['sections'].items():
+            section = buffer[data_start + offset:data_start + offset + length]
+            self.sections[name] = section.cast(typecode) if typecode != 'B' else section
+        self.count = len(self.sections['iri_offsets']) - 1
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        """Round an offset up to a multiple of 8."""
+        return (offset + 7) // 8 * 8
+
+    def _text(self, table: str, number: int) -> str:
+        """Return string number of a string table ('iri' or 'label')."""
+        offsets = self.sections[table + '_offsets']
+        return bytes(self.sections[table + '_text'][offsets[number]:offsets[number + 1]]).decode('utf-8')
+
+    def _neighbours(self, name: str, number: int) -> List[int]:
+        """Return the IRI numbers in row number of a CSR section."""
+        index = self.sections[name + '_index']
+        return self.sections[name][index[number]:index[number + 1]].tolist()
+
+    def covered(self, scheme: str, iri: str) -> Optional[int]:
+        """Return the number of an IRI if the snapshot has complete data for it as a concept of scheme, otherwise None."""
+        number = self.find(iri)
+        if number is None or not self.sections['covered'][number] & self.COVERED_BITS.get(scheme, 0):
+            return None
+        return number
+
+    def find(self, iri: str) -> Optional[int]:
+        """Return the number of an IRI, or None if it isn't in the snapshot."""
+        # UTF-8 byte order is the same as code point order, so the IRIs are compared as bytes.
+        key = iri.encode('utf-8')
+        offsets = self.sections['iri_offsets']
+        text = self.sections['iri_text']
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(text[offsets[middle]:offsets[middle + 1]]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and bytes(text[offsets[low]:offsets[low + 1]]) == key:
+            return low
+        return None
+
+    def label_of(self, iri: str) -> Optional[str]:
+        """Return the English label of a concept ('' if it has none), or None if it isn't in the snapshot."""
+        number = self.find(iri)
+        if number is None:
+            return None
+        return self._text('label', number)
+
+    def narrower(self, scheme: str, iri: str) -> Optional[List[Dict[str, str]]]:
+        """Return the narrower concepts of a concept, like retrieve_narrower_concepts(), or None if it isn't covered."""
+        number = self.covered(scheme, iri)
+        if number is None:
+            return None
+        concepts = [{'iri': self._text('iri', child), 'label': self._text('label', child)}
+                    for child in self._neighbours(scheme + '_narrower', number)]
+        return sorted([concept for concept in concepts if concept['label'] != ''], key=lambda concept: concept['label'])
+
+    def broader(self, iri: str) -> Optional[Tuple[str, str]]:
+        """Return the (label, IRI) of the broader concept of a concept, like retrieve_broader_classification(),
+        or None if it isn't covered."""
+        try:
+            scheme = scheme_from_iri(iri)
+        except ValueError:
+            return None
+        number = self.covered(scheme, iri)
+        if number is None:
+            return None
+        for parent in self._neighbours(scheme + '_broader', number):
+            if self._text('label', parent) != '':
+                # Like the query, only the first broader concept of a Wikidata class is used.
+                return (self._text('label', parent), self._text('iri', parent))
+        return ('', '')
+
+    def equivalents(self, iri: str) -> Optional[Dict[str, List[Tuple[str, str]]]]:
+        """Return the crosswalk pairs of a concept grouped by scheme, like retrieve_equivalents(), or None if it isn't
+        covered in any scheme."""
+        number = self.find(iri)
+        if number is None or not self.sections['covered'][number]:
+            return None
+        index = self.sections['crosswalk_index']
+        predicates = self.sections['crosswalk_predicates'][index[number]:index[number + 1]].tolist()
+        objects = self.sections['crosswalk_objects'][index[number]:index[number + 1]].tolist()
+        return group_equivalents([(self._text('iri', predicate), self._text('iri', concept)) for predicate, concept in zip(predicates, objects)])
+
+    def included_artworks(self, scheme: str, iri: str) -> Optional[List[Dict[str, str]]]:
+        """Return the artworks included in a concept, like retrieve_included_artworks(), or None if it isn't covered."""
+        number = self.covered(scheme, iri)
+        if number is None:
+            return None
+        # Find the concept and all of the concepts below it.
+        concepts = {number}
+        frontier = [number]
+        while frontier:
+            for child in self._neighbours(scheme + '_narrower', frontier.pop()):
+                if child not in concepts:
+                    concepts.add(child)
+                    frontier.append(child)
+        if scheme == 'wikidata':
+            wikidata_classes = concepts
+        else:
+            wikidata_classes = set()
+            for concept in concepts:
+                wikidata_classes.update(self._neighbours('matches', concept))
+
+        artworks = []
+        for wikidata_class in wikidata_classes:
+            class_label = self._text('label', wikidata_class)
+            if class_label == '':
+                continue
+            for artwork in self._neighbours('artworks', wikidata_class):
+                artworks.append({'artwork_iri': self._text('iri', artwork),
+                                 'artwork_label': self._text('label', artwork),
+                                 'class_iri': self._text('iri', wikidata_class),
+                                 'class_label': class_label
+                    })
+        return sorted(artworks, key=lambda artwork: (artwork['class_label'], artwork['artwork_label']))
+
+    @classmethod
+    def build(cls, path: str, verbose=False) -> Dict[str, int]:
+        """Download the concept graph, save it as a snapshot and return the number of IRIs and of each kind of link."""
+        labels = {}
+        edges = {}
+        covered = {}
+        for scheme in cls.RELATIONS:
+            start_time = datetime.datetime.now()
+            covered[scheme] = set()
+            for concept in retrieve_label_dump(scheme):
+                labels[concept['iri']] = concept['label']
+                covered[scheme].add(concept['iri'])
+            edges[scheme] = retrieve_edge_dump(scheme)
+            # The edge dump has the concepts linked to artworks that have no English label.
+            covered[scheme].update(narrower_iri for narrower_iri, broader_iri in edges[scheme])
+            if verbose:
+                print(scheme + ':', len(edges[scheme]), 'links to broader concepts retrieved in', int((datetime.datetime.now() - start_time).total_seconds()), 's')
+        crosswalks = []
+        for subject_iri, pairs_by_scheme in CrosswalkIndex().forward.items():
+            for pairs in pairs_by_scheme.values():
+                crosswalks += [(subject_iri, predicate_iri, object_iri) for predicate_iri, object_iri in pairs]
+        matches = retrieve_match_dump()
+        artworks = retrieve_artwork_dump()
+        if verbose:
+            print(len(crosswalks), 'crosswalk pairs,', len(matches), 'matched classes and', len(artworks), 'artworks retrieved')
+        return cls.save(path, labels, edges, crosswalks, matches, artworks, covered)
+
+    @classmethod
+    def save(cls, path: str, labels: Dict[str, str], edges: Dict[str, List[Tuple[str, str]]], crosswalks: List[Tuple[str, str, str]],
+             matches: List[Tuple[str, str]], artworks: List[Dict[str, str]], covered: Dict[str, set]) -> Dict[str, int]:
+        """Save concept graph data as a snapshot and return the number of IRIs and of each kind of link.
+
+        labels are the English labels of concepts by IRI, edges are the (narrower IRI, broader IRI) links of each scheme,
+        crosswalks are (subject, predicate, object) IRIs, matches are (concept IRI, Wikidata class IRI), artworks are
+        dictionaries with the keys class_iri, artwork_iri and artwork_label, and covered are the IRIs of the concepts
+        of each scheme that are linked to at least one artwork.
+
+        The snapshot is written to a temporary file that then replaces the old one, so a running explorer that
+        has the old file open keeps its copy.
+        """
+        labels = dict(labels)
+        for artwork in artworks:
+            labels[artwork['artwork_iri']] = artwork['artwork_label']
+
+        # Make the string table.
+        iris = set(labels)
+        for pairs in edges.values():
+            for narrower_iri, broader_iri in pairs:
+                iris.update((narrower_iri, broader_iri))
+        for triple in crosswalks:
+            iris.update(triple)
+        for concept_iri, wikidata_class in matches:
+            iris.update((concept_iri, wikidata_class))
+        for artwork in artworks:
+            iris.add(artwork['class_iri'])
+        for concepts in covered.values():
+            iris.update(concepts)
+        iris = sorted(iris)
+        numbers = {iri: number for number, iri in enumerate(iris)}
+
+        sections = {}
+        def add_strings(table, strings):
+            offsets = array('Q', [0])
+            text = bytearray()
+            for string in strings:
+                text += string.encode('utf-8')
+                offsets.append(len(text))
+            sections[table + '_offsets'] = offsets
+            sections[table + '_text'] = text
+        def add_rows(name, pairs, *columns):
+            # Sort the (row number, value numbers...) tuples by row and record where each row starts.
+            pairs = sorted(pairs)
+            index = array('I', [0] * (len(iris) + 1))
+            for pair in pairs:
+                index[pair[0] + 1] += 1
+            for number in range(len(iris)):
+                index[number + 1] += index[number]
+            sections[name + '_index'] = index
+            for position, column in enumerate(columns):
+                sections[column] = array('I', [pair[position + 1] for pair in pairs])
+
+        add_strings('iri', iris)
+        add_strings('label', [labels.get(iri, '') for iri in iris])
+        covered_bits = array('B', [0] * len(iris))
+        for scheme, concepts in covered.items():
+            for concept_iri in concepts:
+                covered_bits[numbers[concept_iri]] |= cls.COVERED_BITS[scheme]
+        sections['covered'] = covered_bits
+        for scheme, pairs in edges.items():
+            links = [(numbers[narrower_iri], numbers[broader_iri]) for narrower_iri, broader_iri in pairs]
+            add_rows(scheme + '_narrower', [(broader, narrower) for narrower, broader in links], scheme + '_narrower')
+            add_rows(scheme + '_broader', links, scheme + '_broader')
+        add_rows('crosswalk', [(numbers[subject_iri], numbers[predicate_iri], numbers[object_iri]) for subject_iri, predicate_iri, object_iri in crosswalks],
+                 'crosswalk_predicates', 'crosswalk_objects')
+        add_rows('matches', [(numbers[concept_iri], numbers[wikidata_class]) for concept_iri, wikidata_class in matches], 'matches')
+        add_rows('artworks', [(numbers[artwork['class_iri']], numbers[artwork['artwork_iri']]) for artwork in artworks], 'artworks')
+
+        # Lay out the sections after the header, each aligned to 8 bytes.
+        layout = {}
+        offset = 0
+        for name, section in sections.items():
+            length = len(section) * (section.itemsize if isinstance(section, array) else 1)
+            layout[name] = (offset, length, section.typecode if isinstance(section, array) else 'B')
+            offset = cls._align(offset + length)
+        header = json.dumps({'built': datetime.datetime.now().isoformat(), 'byteorder': sys.byteorder, 'sections': layout}).encode('utf-8')
+        data_start = cls._align(16 + len(header))
+
+        with open(path + '.tmp', 'wb') as file_object:
+            file_object.write(cls.MAGIC + struct.pack('<Q', len(header)) + header)
+            for name, section in sections.items():
+                file_object.write(b'\0' * (data_start + layout[name][0] - file_object.tell()))
+                file_object.write(section if isinstance(section, bytearray) else section.tobytes())
+        os.replace(path + '.tmp', path)
+        return {'iris': len(iris), 'broader_links': sum(len(pairs) for pairs in edges.values()), 'crosswalk_pairs': len(crosswalks),
+                'matched_classes': len(matches), 'artworks': len(artworks)}
+
+
+class LocalMirror:
+    """Local copy in an SQLite database of the triples of each named graph that the explorer uses, kept up to date
+    by downloading only the parts of each graph that have changed.
+
+    The triples of a graph are divided into buckets by the first hexadecimal digits of the MD5 hash of their
+    subject. For each bucket, the endpoint computes the number of triples and a checksum (the sum of the number
+    made of the first CHECKSUM_DIGITS hexadecimal digits of the MD5 hash of each triple) with one grouped query,
+    and the mirror computes the same from its copy. Only the triples of buckets whose counts or checksums differ are downloaded, and the triples that were
+    added or removed are applied to the copy.
+
+    Parameters
+    -----------
+    path: str
+        Path (including filename) of the SQLite database. It is created if it doesn't exist.
+    bucket_digits: int
+        Number of hexadecimal digits of the subject hash that name a bucket, so there are 16 ** bucket_digits buckets per graph.
+    """
+    # The predicates of the links and labels used by the queries of the explorer.
+    PREDICATES = ['http://www.wikidata.org/prop/direct/P31',
+                  'http://www.wikidata.org/prop/direct/P279',
+                  'http://vocab.getty.edu/ontology#broaderPreferred',
+                  'http://www.w3.org/2004/02/skos/core#broader',
+                  'http://www.w3.org/2004/02/skos/core#exactMatch',
+                  'http://www.w3.org/2004/02/skos/core#broadMatch',
+                  'http://www.w3.org/2004/02/skos/core#closeMatch',
+                  'http://www.w3.org/2004/02/skos/core#prefLabel',
+                  'http://www.w3.org/2000/01/rdf-schema#label',
+                  'http://www.w3.org/2008/05/skos-xl#prefLabel',
+                  'http://www.w3.org/2008/05/skos-xl#literalForm']
+    CHECKSUM_DIGITS = 8 # 32 bits, so a replaced triple leaves the checksum unchanged about once in four billion times
+    FULL_FETCH_FRACTION = 0.25 # Download the whole graph rather than the changed buckets when more than this fraction of the buckets changed
+
+    def __init__(self, path, bucket_digits=2):
+        self.path = path
+        self.bucket_digits = bucket_digits
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS triples (graph TEXT, bucket TEXT, subject TEXT, predicate TEXT, object TEXT,
+                                   language TEXT, literal INTEGER, checksum INTEGER)''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS triples_bucket ON triples (graph, bucket)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS graphs (graph TEXT PRIMARY KEY, synced TEXT, triples INTEGER)')
+        # Mirrors saved with the earlier 16 bit checksums are updated, so their buckets match the endpoint's again.
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] < self.CHECKSUM_DIGITS:
+            self.connection.create_function('triple_checksum', 3, self.triple_checksum)
+            self.connection.execute('UPDATE triples SET checksum = triple_checksum(subject, predicate, object)')
+            self.connection.execute('PRAGMA user_version = ' + str(self.CHECKSUM_DIGITS))
+        self.connection.commit()
+
+    def _pattern(self, graph_uri: str) -> str:
+        """Return the graph pattern of the triples of a graph that are mirrored.
+
+        Triples with blank nodes are left out, since STR() of a blank node is an error, which would leave the bucket
+        unbound, and blank node labels can change from one query to the next, so their buckets would never match.
+        """
+        if graph_uri == CROSSWALK_GRAPH:
+            # All links in the crosswalk graph, like CrosswalkIndex
+            return '''?s ?p ?o.
+filter(isIRI(?s) && isIRI(?o))
+'''
+        return '''VALUES ?p {<''' + '> <'.join(self.PREDICATES) + '''>}
+?s ?p ?o.
+filter(isIRI(?s) && !isBlank(?o))
+filter(!isLiteral(?o) || lang(?o) = "en")
+'''
+
+    @classmethod
+    def triple_checksum(cls, subject: str, predicate: str, object_string: str) -> int:
+        """Return the number that a triple adds to the checksum of its bucket: the first CHECKSUM_DIGITS hexadecimal digits of its MD5 hash."""
+        return int(hashlib.md5((subject + ' ' + predicate + ' ' + object_string).encode('utf-8')).hexdigest()[:cls.CHECKSUM_DIGITS], 16)
+
+    def discover_graphs(self) -> List[str]:
+        """Return the named graphs at the endpoint that have triples with the mirrored predicates, and the crosswalk graph."""
+        query_string = '''SELECT DISTINCT ?g
+WHERE {
+VALUES ?p {<''' + '> <'.join(self.PREDICATES) + '''>}
+GRAPH ?g {?s ?p ?o.}
+}
+'''
+        data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS
+        graphs = [result['g']['value'] for result in data]
+        if CROSSWALK_GRAPH not in graphs:
+            graphs.append(CROSSWALK_GRAPH)
+        return sorted(graphs)
+
+    def remote_signatures(self, graph_uri: str) -> Dict[str, Tuple[int, int]]:
+        """Return the (number of triples, checksum) of each non-empty bucket of a graph at the endpoint."""
+        # The checksum of a triple is computed from hexadecimal digits by finding each digit's position in "0123456789abcdef".
+        digit_values = ' + '.join(['STRLEN(STRBEFORE("0123456789abcdef", SUBSTR(?hash, ' + str(position + 1) + ', 1))) * ' + str(16 ** (self.CHECKSUM_DIGITS - 1 - position))
+                                   for position in range(self.CHECKSUM_DIGITS)])
+        query_string = '''SELECT ?bucket (COUNT(*) AS ?count) (SUM(?value) AS ?checksum)
+FROM <''' + graph_uri + '''>
+WHERE {
+''' + self._pattern(graph_uri) + '''BIND(SUBSTR(MD5(STR(?s)), 1, ''' + str(self.bucket_digits) + ''') AS ?bucket)
+BIND(MD5(CONCAT(STR(?s), " ", STR(?p), " ", STR(?o))) AS ?hash)
+BIND(''' + digit_values + ''' AS ?value)
+}
+GROUP BY ?bucket
+'''
+        data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS
+        return {result['bucket']['value']: (int(result['count']['value']), int(result['checksum']['value'])) for result in data}
+
+    def local_signatures(self, graph_uri: str) -> Dict[str, Tuple[int, int]]:
+        """Return the (number of triples, checksum) of each non-empty bucket of the local copy of a graph."""
+        rows = self.connection.execute('SELECT bucket, COUNT(*), SUM(checksum) FROM triples WHERE graph = ? GROUP BY bucket', (graph_uri,))
+        return {bucket: (count, checksum) for bucket, count, checksum in rows}
+
+    def fetch_buckets(self, graph_uri: str, buckets: Optional[List[str]] = None) -> Dict[str, set]:
+        """Download the mirrored triples of some buckets of a graph, or of the whole graph if buckets is None, in one query.
+        Returns the triples of each bucket as sets of (subject, predicate, object, language, literal) tuples."""
+        bucket_filter = ''
+        if buckets is not None:
+            # The endpoint hashes every subject of the graph to filter on the bucket, so all the buckets share one query.
+            bucket_filter = 'filter(SUBSTR(MD5(STR(?s)), 1, ' + str(self.bucket_digits) + ') IN ("' + '", "'.join(buckets) + '"))\n'
+        query_string = '''SELECT ?s ?p ?o
+FROM <''' + graph_uri + '''>
+WHERE {
+''' + self._pattern(graph_uri) + bucket_filter + '''}
+'''
+        data = Sparqler(use_cache=False, timeout=DUMP_TIMEOUT).query(query_string) # default to ENDPOINTS
+        triples = {bucket: set() for bucket in buckets or []}
+        for result in data:
+            literal = result['o']['type'] in ('literal', 'typed-literal')
+            bucket = hashlib.md5(result['s']['value'].encode('utf-8')).hexdigest()[:self.bucket_digits]
+            triples.setdefault(bucket, set()).add((result['s']['value'], result['p']['value'], result['o']['value'], result['o'].get('xml:lang', ''), int(literal)))
+        return triples
+
+    def sync_graph(self, graph_uri: str, verbose: bool = True) -> Dict[str, Any]:
+        """Bring the local copy of a graph up to date and return the numbers of changed buckets and of added and removed triples.
+
+        The changed buckets are downloaded in one query. If more than FULL_FETCH_FRACTION of the buckets changed, the
+        whole graph is downloaded instead, which saves the endpoint from hashing the subjects, and split into buckets here.
+        """
+        start_time = datetime.datetime.now()
+        remote = self.remote_signatures(graph_uri)
+        local = self.local_signatures(graph_uri)
+        changed = sorted(bucket for bucket in set(remote) | set(local) if remote.get(bucket) != local.get(bucket))
+        added = 0
+        removed = 0
+        if changed:
+            if len(changed) > self.FULL_FETCH_FRACTION * 16 ** self.bucket_digits:
+                fetched = self.fetch_buckets(graph_uri)
+            else:
+                fetched = self.fetch_buckets(graph_uri, changed)
+            for bucket in changed:
+                remote_triples = fetched.get(bucket, set())
+                rows = self.connection.execute('SELECT subject, predicate, object, language, literal FROM triples WHERE graph = ? AND bucket = ?', (graph_uri, bucket))
+                local_triples = set(rows)
+                for triple in local_triples - remote_triples:
+                    self.connection.execute('DELETE FROM triples WHERE graph = ? AND bucket = ? AND subject = ? AND predicate = ? AND object = ? AND language = ? AND literal = ?',
+                                            (graph_uri, bucket) + triple)
+                self.connection.executemany('INSERT INTO triples VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                            [(graph_uri, bucket) + triple + (self.triple_checksum(*triple[:3]),) for triple in remote_triples - local_triples])
+                self.connection.commit() # Commit each bucket so that an interrupted sync keeps the buckets that are done.
+                added += len(remote_triples - local_triples)
+                removed += len(local_triples - remote_triples)
+
+        triple_count = sum(count for count, checksum in remote.values())
+        self.connection.execute('INSERT OR REPLACE INTO graphs VALUES (?, ?, ?)', (graph_uri, datetime.datetime.now().isoformat(), triple_count))
+        self.connection.commit()
+        elapsed = (datetime.datetime.now() - start_time).total_seconds()
+        if verbose:
+            print(graph_uri + ':', len(changed), 'of', len(set(remote) | set(local)), 'buckets changed,', added, 'triples added,', removed, 'removed,',
+                  triple_count, 'in total, in', round(elapsed, 1), 's')
+        return {'graph': graph_uri, 'buckets_changed': len(changed), 'added': added, 'removed': removed, 'triples': triple_count, 'elapsed': elapsed}
+
+    def snapshot_data(self) -> Tuple[Dict[str, str], Dict[str, List[Tuple[str, str]]], List[Tuple[str, str, str]], List[Tuple[str, str]], List[Dict[str, str]], Dict[str, set]]:
+        """Return the labels, edges, crosswalks, matches, artworks and covered concepts for ConceptSnapshot.save(), found from the local copy with
+        the same relationships as retrieve_label_dump(), retrieve_edge_dump(), CrosswalkIndex, retrieve_match_dump() and retrieve_artwork_dump()."""
+        objects = {} # predicate IRI: {subject IRI: [object IRIs]}
+        english = {} # predicate IRI: {subject IRI: English literal}
+        crosswalks = set()
+        for graph_uri, subject, predicate, object_string, language, literal in self.connection.execute(
+                'SELECT DISTINCT graph, subject, predicate, object, language, literal FROM triples'):
+            if graph_uri == CROSSWALK_GRAPH and not literal:
+                crosswalks.add((subject, predicate, object_string))
+            if not literal:
+                objects.setdefault(predicate, {}).setdefault(subject, []).append(object_string)
+            elif language == 'en':
+                english.setdefault(predicate, {})[subject] = object_string
+
+        def linked(predicate, subject):
+            return objects.get(predicate, {}).get(subject, [])
+        def ancestors_or_self(concepts, predicate):
+            found = set(concepts)
+            stack = list(concepts)
+            while stack:
+                for parent in linked(predicate, stack.pop()):
+                    if parent not in found:
+                        found.add(parent)
+                        stack.append(parent)
+            return found
+
+        instance_of = 'http://www.wikidata.org/prop/direct/P31'
+        rdfs_label = 'http://www.w3.org/2000/01/rdf-schema#label'
+        artworks = []
+        wikidata_classes = set()
+        for artwork_iri, classes in objects.get(instance_of, {}).items():
+            wikidata_classes.update(classes)
+            if artwork_iri in english.get(rdfs_label, {}):
+                artworks += [{'class_iri': class_iri, 'artwork_iri': artwork_iri, 'artwork_label': english[rdfs_label][artwork_iri]} for class_iri in classes]
+        matches = set()
+        for wikidata_class in wikidata_classes:
+            for match_type in ['exactMatch', 'broadMatch', 'closeMatch']:
+                matches.update((concept_iri, wikidata_class) for concept_iri in linked('http://www.w3.org/2004/02/skos/core#' + match_type, wikidata_class))
+        matched_concepts = {concept_iri for concept_iri, wikidata_class in matches}
+
+        labels = {}
+        edges = {}
+        covered = {}
+        for scheme, relation in ConceptSnapshot.RELATIONS.items():
+            if scheme == 'wikidata':
+                concepts = ancestors_or_self(wikidata_classes, relation)
+            else:
+                concepts = ancestors_or_self(matched_concepts, relation)
+            if scheme == 'nomenclature':
+                concepts = {concept for concept in concepts if 'nomenclature' in concept}
+            edges[scheme] = [(concept, parent) for concept in concepts for parent in linked(relation, concept)]
+            covered[scheme] = concepts
+            for concept in concepts:
+                if scheme == 'wikidata':
+                    label = english.get(rdfs_label, {}).get(concept)
+                elif scheme == 'aat':
+                    label = None
+                    for label_object in linked('http://www.w3.org/2008/05/skos-xl#prefLabel', concept):
+                        label = english.get('http://www.w3.org/2008/05/skos-xl#literalForm', {}).get(label_object, label)
+                else:
+                    label = english.get('http://www.w3.org/2004/02/skos/core#prefLabel', {}).get(concept)
+                if label is not None:
+                    labels[concept] = label
+        return labels, edges, sorted(crosswalks), sorted(matches), artworks, covered
+
+
+class NavigationHistory:
+    """Back/forward history of complete snapshots of the views that have been displayed.
+
+    The snapshots are the view dictionaries built by the navigations (labels, IRIs, match types, subclasses
+    and artworks), so a view in the history can be displayed again without sending any queries. The views
+    aren't changed after they are built, so they are stored without copying.
+
+    Parameters
+    -----------
+    max_bytes: int
+        Approximate limit on the memory used by the snapshots, estimated from the size of their JSON.
+        The oldest snapshots are dropped when it is exceeded. The current view is always kept.
+    """
+    def __init__(self, max_bytes=HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.views = []
+        self.sizes = []
+        self.position = -1 # Index of the view being displayed
+        self.total_bytes = 0
+
+    def push(self, view: Dict[str, Any]) -> None:
+        """Add a newly displayed view after the current one, dropping any views that were forward of it."""
+        while len(self.views) > self.position + 1:
+            self.views.pop()
+            self.total_bytes -= self.sizes.pop()
+        self.views.append(view)
+        self.sizes.append(len(json.dumps(view)))
+        self.total_bytes += self.sizes[-1]
+        self.position = len(self.views) - 1
+
+        # Drop the oldest views until the history fits within the limit.
+        while self.total_bytes > self.max_bytes and len(self.views) > 1:
+            self.views.pop(0)
+            self.total_bytes -= self.sizes.pop(0)
+            self.position -= 1
+
+    def can_go_back(self) -> bool:
+        return self.position > 0
+
+    def can_go_forward(self) -> bool:
+        return self.position < len(self.views) - 1
+
+    def back(self) -> Optional[Dict[str, Any]]:
+        """Move to the previous view and return it, or return None if there isn't one."""
+        if not self.can_go_back():
+            return None
+        self.position -= 1
+        return self.views[self.position]
+
+    def forward(self) -> Optional[Dict[str, Any]]:
+        """Move to the next view and return it, or return None if there isn't one."""
+        if not self.can_go_forward():
+            return None
+        self.position += 1
+        return self.views[self.position]
+
+    def find(self, scheme_name: str, concept_iri: str) -> Optional[Dict[str, Any]]:
+        """Return the most recent view of a concept in a scheme, or None if it isn't in the history."""
+        if concept_iri == '':
+            return None
+        for view in reversed(self.views):
+            if view['scheme'] == scheme_name and view['classification'][scheme_name] == concept_iri:
+                return view
+        return None
+
+
+class ResponseCache:
+    """Persistent cache of query responses in an SQLite database, shared by all Sparqler objects.
+
+    Responses are keyed by a hash of the query payload and the requested media type. SQLite handles the
+    locking, so several processes (for example the GUI and a warm-up job) can use the same file.
+
+    Parameters
+    -----------
+    path: str
+        Path (including filename) of the SQLite database. It is created if it doesn't exist.
+    max_age: float
+        Number of seconds after which a cached response is ignored. None for no expiry. Defaults to CACHE_MAX_AGE.
+    """
+    def __init__(self, path, max_age=CACHE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL') # Readers don't block the writer.
+        self.connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored REAL, response TEXT)')
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def key(payload: Dict[str, Any], media_type: str) -> str:
+        """Return the cache key for a query payload and media type."""
+        return hashlib.sha256(json.dumps([media_type, payload], sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None if there isn't one that is new enough."""
+        with self.lock:
+            row = self.connection.execute('SELECT stored, response FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or (self.max_age is not None and time.time() - row[0] > self.max_age):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[1]
+
+    def put(self, key: str, response_text: str) -> None:
+        """Save a response, replacing any earlier response for the same key."""
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO responses (key, stored, response) VALUES (?, ?, ?)', (key, time.time(), response_text))
+            self.connection.commit()
+            self.writes += 1
+
+    def count(self) -> int:
+        """Return the number of responses in the cache, including expired ones."""
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+class SubclassPanel:
+    """Scrollable list of subclass buttons that reuses a fixed pool of Button widgets.
+
+    Only enough buttons to fill the visible rows are ever created. Showing a new list of subclasses or
+    scrolling changes the text of the pooled buttons in place (and only for rows whose subclass changed),
+    so updating the panel costs the same no matter how many subclasses there are.
+
+    Parameters
+    -----------
+    master: tkinter widget
+        The widget that contains the panel. Grid the panel using its .frame attribute.
+    command: function
+        Called with the IRI of a subclass when its button is clicked.
+    visible_rows: int
+        Number of buttons in the pool. Defaults to 10.
+    width: int
+        Width of the buttons in characters. Defaults to 30.
+    """
+    def __init__(self, master, command, visible_rows=10, width=30):
+        self.command = command
+        self.visible_rows = visible_rows
+        self.subclasses = []
+        self.first_row = 0 # Index of the subclass shown in the top button
+
+        self.frame = Frame(master)
+        self.scrollbar = Scrollbar(self.frame, orient=VERTICAL, command=self.yview)
+
+        # The buttons are created once. The command of each button looks up the subclass that is currently
+        # displayed in its row, so the commands never need to be changed.
+        self.buttons = []
+        self.displayed = [] # The (label, IRI) currently shown by each button, or None if the button is hidden
+        for row in range(visible_rows):
+            button = Button(self.frame, width=width, command=lambda row=row: self.click(row))
+            self.buttons.append(button)
+            self.displayed.append(None)
+
+        for widget in [self.frame] + self.buttons:
+            widget.bind('<MouseWheel>', self.mouse_wheel) # Windows and macOS
+            widget.bind('<Button-4>', self.mouse_wheel) # Linux scroll up
+            widget.bind('<Button-5>', self.mouse_wheel) # Linux scroll down
+
+    def show(self, subclass_list: List[Dict[str, str]]) -> None:
+        """Display a new list of subclasses, scrolled to the top."""
+        if subclass_list == self.subclasses and self.first_row == 0:
+            return # Nothing has changed
+        self.subclasses = list(subclass_list)
+        self.first_row = 0
+        self.render()
+
+    def render(self) -> None:
+        """Update the pooled buttons to show the subclasses starting at self.first_row."""
+        for row, button in enumerate(self.buttons):
+            index = self.first_row + row
+            if index < len(self.subclasses):
+                item = (self.subclasses[index]['label'], self.subclasses[index]['iri'])
+                if self.displayed[row] != item: # Only change buttons whose subclass is different.
+                    button.config(text=item[0] + '\nterm: ' + item[1])
+                if self.displayed[row] is None:
+                    button.grid(column=0, row=row)
+                self.displayed[row] = item
+            elif self.displayed[row] is not None:
+                button.grid_remove()
+                self.displayed[row] = None
+
+        # Only show the scrollbar if there are more subclasses than buttons.
+        if len(self.subclasses) > self.visible_rows:
+            self.scrollbar.grid(column=1, row=0, rowspan=self.visible_rows, sticky=(N, S))
+            self.scrollbar.set(self.first_row / len(self.subclasses), (self.first_row + self.visible_rows) / len(self.subclasses))
+        else:
+            self.scrollbar.grid_remove()
+
+    def scroll_to(self, first_row: int) -> None:
+        """Scroll so that the subclass with index first_row is at the top, within the limits of the list."""
+        first_row = max(0, min(first_row, len(self.subclasses) - self.visible_rows))
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.render()
+
+    def yview(self, *args) -> None:
+        """Handle the commands sent by the scrollbar."""
+        if args[0] == 'moveto':
+            self.scroll_to(int(round(float(args[1]) * len(self.subclasses))))
+        elif args[0] == 'scroll':
+            if args[2] == 'pages':
+                self.scroll_to(self.first_row + int(args[1]) * self.visible_rows)
+            else:
+                self.scroll_to(self.first_row + int(args[1]))
+
+    def mouse_wheel(self, event) -> None:
+        """Scroll one row for each click of the mouse wheel."""
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.first_row - 1)
+        else:
+            self.scroll_to(self.first_row + 1)
+
+    def click(self, row: int) -> None:
+        """Pass the IRI of the subclass displayed in the clicked row to the command."""
+        if self.displayed[row] is not None:
+            self.command(self.displayed[row][1])
+
+
+# ------------
+# Set up tracing
+# ------------
+
+TRACER = Tracer(enabled=TRACE_PATH != '', profile_dir=PROFILE_DIR)
+if TRACER.enabled:
+    atexit.register(TRACER.save, TRACE_PATH) # Also saves the trace when a command line job calls sys.exit()
+if PROFILE_DIR:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+# ------------
+# Load local data
+# ------------
+
+if CACHE_PATH:
+    RESPONSE_CACHE = ResponseCache(CACHE_PATH, max_age=CACHE_MAX_AGE)
+else:
+    RESPONSE_CACHE = None
+
+# Map the concept graph snapshot if there is one, but not when building a new one, so the dumps come from the endpoint.
+if os.path.exists(SNAPSHOT_PATH) and not BUILD_SNAPSHOT:
+    SNAPSHOT = ConceptSnapshot(SNAPSHOT_PATH)
+else:
+    SNAPSHOT = None
+
+# Load the crosswalk graph into memory unless each concept's equivalents are found by a query.
+if CROSSWALK_MODE == 'preload':
+    CROSSWALKS = CrosswalkIndex()
+elif CROSSWALK_MODE == 'lazy':
+    CROSSWALKS = CrosswalkIndex(lazy=True)
+else:
+    CROSSWALKS = None
+
+# ------------
+# Jobs run from the command line without the GUI
+# ------------
+
+if BUILD_INDEX:
+    start_time = datetime.datetime.now()
+    search_index = ConceptSearchIndex.build(verbose=True)
+    search_index.save(INDEX_PATH)
+    print(len(search_index.entries), 'concepts saved to', INDEX_PATH, 'in', int((datetime.datetime.now() - start_time).total_seconds()), 's')
+    sys.exit()
+
+if BUILD_SNAPSHOT:
+    start_time = datetime.datetime.now()
+    counts = ConceptSnapshot.build(SNAPSHOT_PATH, verbose=True)
+    print(counts['iris'], 'IRIs,', counts['broader_links'], 'links to broader concepts,', counts['crosswalk_pairs'], 'crosswalk pairs and',
+          counts['artworks'], 'artworks saved to', SNAPSHOT_PATH, 'in', int((datetime.datetime.now() - start_time).total_seconds()), 's')
+    sys.exit()
+
+if SYNC:
+    start_time = datetime.datetime.now()
+    mirror = LocalMirror(MIRROR_PATH)
+    graphs = [graph_uri.strip() for graph_uri in SYNC_GRAPHS.split(',') if graph_uri.strip() != '']
+    if not graphs:
+        graphs = mirror.discover_graphs()
+    results = [mirror.sync_graph(graph_uri) for graph_uri in graphs]
+    added = sum(result['added'] for result in results)
+    removed = sum(result['removed'] for result in results)
+    print('Sync finished:', len(graphs), 'graphs,', added, 'triples added,', removed, 'triples removed, in',
+          round((datetime.datetime.now() - start_time).total_seconds(), 1), 's')
+    if added or removed or not os.path.exists(SNAPSHOT_PATH):
+        counts = ConceptSnapshot.save(SNAPSHOT_PATH, *mirror.snapshot_data())
+        print(counts['iris'], 'IRIs,', counts['broader_links'], 'links to broader concepts,', counts['crosswalk_pairs'], 'crosswalk pairs and',
+              counts['artworks'], 'artworks saved to', SNAPSHOT_PATH, 'from', MIRROR_PATH)
+    sys.exit()
+
+if WARM_UP_DEPTH is not None:
+    if RESPONSE_CACHE is None:
+        print('Use the --cache argument to specify the response cache to warm up.')
+        sys.exit()
+    # Send every query, rather than answering from the snapshot or the crosswalk index, so the responses are cached.
+    SNAPSHOT = None
+    CROSSWALKS = None
+    cached_before = RESPONSE_CACHE.count()
+    summary = crawl_hierarchy(crawl_roots(CRAWL_ROOTS), visit_for_warm_up, max_workers=CRAWL_WORKERS, max_depth=WARM_UP_DEPTH)
+    print('Warm-up finished:', summary['nodes'], 'concepts in', round(summary['elapsed'], 1), 's;',
+          RESPONSE_CACHE.writes, 'cache entries written,', RESPONSE_CACHE.hits, 'already cached,',
+          RESPONSE_CACHE.count() - cached_before, 'new entries in', CACHE_PATH)
+    sys.exit()
+
+if CRAWL_REPORT_PATH:
+    checkpoint_path = CRAWL_REPORT_PATH + '.checkpoint.json'
+    if os.path.exists(checkpoint_path):
+        roots = [] # The roots are in the checkpoint.
+    else:
+        roots = crawl_roots(CRAWL_ROOTS)
+    crawl_hierarchy(roots, visit_for_coverage, max_workers=CRAWL_WORKERS, max_depth=CRAWL_DEPTH, checkpoint_path=checkpoint_path,
+                    report_path=CRAWL_REPORT_PATH, report_fields=COVERAGE_REPORT_FIELDS)
+    sys.exit()
 
 # ------------
 # Set up GUI
@@ -884,26 +3120,87 @@ results_text.set('Click a subclass button below')
     #subclass_list_box.see(END) #causes scroll up as text is added
 #    root.update_idletasks() # causes update to log window, see https://stackoverflow.com/questions/6588141/update-a-tkinter-text-widget-as-its-written-rather-than-after-the-class-is-fini
 
-# Get the subclasses for the current classification, then display them.
+# Create the back and forward buttons for the navigation history.
+HISTORY = NavigationHistory(max_bytes=HISTORY_MAX_BYTES)
+history_frame = Frame(mainframe)
+history_frame.grid(column=3, row=1, sticky=(N, E))
+back_history_button = Button(history_frame, text='< Back', width=10, state=DISABLED, command=back_button)
+back_history_button.grid(column=0, row=0)
+forward_history_button = Button(history_frame, text='Forward >', width=10, state=DISABLED, command=forward_button)
+forward_history_button.grid(column=1, row=0)
+if CROSSWALKS is not None:
+    Button(history_frame, text='Refresh crosswalks', width=16, command=refresh_crosswalks_button).grid(column=2, row=0)
+
+# Create a search box with a list of suggestions from the local concept search index.
+search_frame = Frame(mainframe)
+search_frame.grid(column=1, row=1, sticky=(N, W))
+search_text = StringVar()
+search_entry = Entry(search_frame, textvariable=search_text, width=40)
+search_entry.grid(column=0, row=0, sticky=W)
+suggestions_list = Listbox(search_frame, width=40, height=6)
+suggestions_list.grid(column=0, row=1, sticky=W)
+SUGGESTION_IRIS = [] # The IRIs of the concepts in the suggestions list
+
+SEARCH_INDEX = None
+
+def load_search_index():
+    """Load the search index in a worker thread, since reading a large index takes a noticeable time."""
+    global SEARCH_INDEX
+    try:
+        SEARCH_INDEX = ConceptSearchIndex.load(INDEX_PATH)
+    except Exception as error: # For example, a damaged file.
+        print('Error loading the search index:', error)
+        SEARCH_INDEX = False
+
+def enable_search():
+    """Enable the search box when the search index has been loaded. Checks again every 100 ms until then."""
+    if SEARCH_INDEX is None:
+        root.after(100, enable_search)
+    elif SEARCH_INDEX:
+        search_entry.config(state=NORMAL)
+        search_text.set('')
+    else:
+        search_text.set('The search index could not be loaded. Run with --build-index')
+
+search_entry.config(state=DISABLED)
+if os.path.exists(INDEX_PATH):
+    search_text.set('Loading the search index...')
+    threading.Thread(target=load_search_index, daemon=True).start()
+    root.after(100, enable_search)
+else:
+    search_text.set('No search index. Run with --build-index')
+
+def update_suggestions(event=None):
+    """Show the concepts that match the text in the search box."""
+    suggestions_list.delete(0, END)
+    SUGGESTION_IRIS.clear()
+    for iri, label, scheme in SEARCH_INDEX.search(search_text.get()):
+        suggestions_list.insert(END, label + ' (' + scheme + ')')
+        SUGGESTION_IRIS.append(iri)
+
+def choose_suggestion(event=None):
+    """Navigate to the selected suggestion, or the first one if none is selected."""
+    selection = suggestions_list.curselection()
+    if selection:
+        jump_to_concept(SUGGESTION_IRIS[selection[0]])
+    elif SUGGESTION_IRIS:
+        jump_to_concept(SUGGESTION_IRIS[0])
+
+search_entry.bind('<KeyRelease>', update_suggestions)
+search_entry.bind('<Return>', choose_suggestion)
+suggestions_list.bind('<Double-Button-1>', choose_suggestion)
+suggestions_list.bind('<Return>', choose_suggestion)
+
+# The subclasses for the current classification are displayed when the first navigation finishes (see below).
 
-subclass_list = retrieve_narrower_concepts(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
 #subclass_string = ''
 #for subclass in subclass_list:
 #    subclass_string += subclass['label'] + ' ' + subclass['iri'] + '\n'
 #update_subclasses_box(subclass_string)
 
-def generate_subclass_buttons(subclass_list: List[Dict[str, str]]) -> List[Button]:
-    """Generate buttons for the subclasses of the current classification."""
-    subclass_buttons = []
-    for index, subclass in enumerate(subclass_list):
-        # Need to pass the subclass IRI by value, not by reference, so it will be the value at the time the button is created.
-        button = Button(mainframe, text = subclass['label'] + '\nterm: ' + subclass['iri'], width = 30, command = lambda subclass_iri=subclass['iri']: move_to_subclass(subclass_iri) )
-        #button = Button(mainframe, text = subclass['label'] + '\nterm: ' + subclass['iri'], width = 30, command = lambda: move_to_subclass(subclass['iri']) )
-        button.grid(column=3, row=index+4)
-        subclass_buttons.append(button)
-    return subclass_buttons
-
-EXISTING_SUBCLASS_BUTTONS = generate_subclass_buttons(subclass_list) # Pass in an emtpy list for the subclass buttons at first.
+# The subclass panel keeps a fixed pool of buttons and scrolls through the subclasses.
+subclass_panel = SubclassPanel(mainframe, move_to_subclass, visible_rows=SUBCLASS_ROWS, width=30)
+subclass_panel.frame.grid(column=3, row=4, sticky=N)
 
 # Generate buttons after the subclass buttons are created.
 broader_button = Button(mainframe, text = 'Broader ' + CURRENT_SCHEME_ORIENTATION['current'] + '\nterm: ' + LABEL['broader'], width = 30, command = lambda: parent_concept_button(CURRENT_SCHEME_ORIENTATION['current']) )
@@ -932,7 +3229,10 @@ def update_artworks(result):
     #artworks_list.see(END) #causes scroll up as text is added
     root.update_idletasks() # causes update to log window, see https://stackoverflow.com/questions/6588141/update-a-tkinter-text-widget-as-its-written-rather-than-after-the-class-is-fini
 
-retrieve_included_artworks(CURRENT_SCHEME_ORIENTATION['current'], CLASSIFICATION[CURRENT_SCHEME_ORIENTATION['current']])
+# Build the view of the starting classification (broader concept, subclasses and artworks) in the background
+# like any other navigation, and check for finished views every 50 ms.
+start_navigation(build_scheme_view, CURRENT_SCHEME_ORIENTATION['current'])
+root.after(50, poll_navigation_results)
 
 def main():	
     root.mainloop()
@@ -0,0 +1,29 @@
+"""Load the functions and classes of sparql_classification_gui.py without opening the GUI.
+
+The script sets up the GUI when it is run, so only the part before the "Set up GUI" section is executed.
+"""
+import os
+import sys
+import types
+
+import pytest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sparql_classification_gui.py')
+
+
+@pytest.fixture(scope='session')
+def gui_module(tmp_path_factory):
+    with open(SCRIPT_PATH, 'rt', encoding='utf-8') as file_object:
+        source = file_object.read()
+    source = source[:source.index('# ------------\n# Set up GUI')]
+
+    module = types.ModuleType('sparql_classification_gui')
+    module.__file__ = SCRIPT_PATH
+    # Use a snapshot path that doesn't exist, so a snapshot in the working directory isn't opened.
+    saved_argv = sys.argv
+    sys.argv = [SCRIPT_PATH, '--snapshot', str(tmp_path_factory.mktemp('snapshot') / 'none.bin')]
+    try:
+        exec(compile(source, SCRIPT_PATH, 'exec'), module.__dict__)
+    finally:
+        sys.argv = saved_argv
+    return module
@@ -0,0 +1,91 @@
+"""Chunking and retries of Sparqler.insert_data_chunked(), with a fake endpoint that records the update requests."""
+import re
+
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, ok):
+        self.ok = ok
+        self.text = ''
+
+
+@pytest.fixture
+def sparqler(gui_module, monkeypatch):
+    sparqler = gui_module.Sparqler(method='post', endpoint='http://example.org/sparql', sleep=0)
+    sparqler.requests = []
+    sparqler.failing = False
+    def fake_post_update(payload, headers, timeout=None):
+        sparqler.requests.append((payload['update'], timeout))
+        return FakeResponse(not sparqler.failing)
+    monkeypatch.setattr(sparqler, '_post_update', fake_post_update)
+    return sparqler
+
+
+def chunk_triples(request_string):
+    """Return the triples in an INSERT DATA request."""
+    return re.search(r'\{\n(.*)\n\} \}', request_string, re.DOTALL).group(1).split('\n')
+
+
+def test_blank_node_groups_are_not_split(sparqler):
+    triples = ['_:b0 <http://example.org/p> <http://example.org/a> .',
+               '<http://example.org/x> <http://example.org/p> "mentions _:b0 and _:b1" .',
+               '<http://example.org/y> <http://example.org/q> _:b1 .',
+               '_:b1 <http://example.org/r> _:b0 .',
+               '<http://example.org/z> <http://example.org/p> <http://example.org/w> .']
+    # With a limit smaller than any triple, every group is a chunk of its own.
+    summary = sparqler.insert_data_chunked(triples, 'http://example.org/graph', max_chunk_bytes=1)
+    assert [chunk_triples(request_string) for request_string, timeout in sparqler.requests] == [
+        [triples[0], triples[2], triples[3]], # Linked by _:b0 and _:b1, and sent together although over the limit
+        [triples[1]], # "_:b0" in a literal isn't a blank node
+        [triples[4]]]
+    assert summary['requests'] == 3
+    assert summary['triples'] == 5
+
+
+def test_chunks_are_packed_up_to_the_limit(sparqler):
+    triples = ['<http://example.org/s' + str(index) + '> <http://example.org/p> "o" .' for index in range(5)]
+    triple_bytes = len(triples[0]) + 1
+    sparqler.insert_data_chunked('\n'.join(triples) + '\n# a comment\n\n', 'http://example.org/graph', max_chunk_bytes=2 * triple_bytes)
+    assert [len(chunk_triples(request_string)) for request_string, timeout in sparqler.requests] == [2, 2, 1]
+    assert all(timeout == 600 for request_string, timeout in sparqler.requests)
+
+
+def test_only_retryable_chunks_are_resent(sparqler, gui_module, monkeypatch):
+    waits = []
+    monkeypatch.setattr(gui_module.time, 'sleep', lambda seconds: waits.append(seconds))
+    sparqler.failing = True
+    triples = ['<http://example.org/a> <http://example.org/p> _:b0 .',
+               '<http://example.org/b> <http://example.org/p> <http://example.org/c> .']
+    summary = sparqler.insert_data_chunked(triples, 'http://example.org/graph', max_chunk_bytes=1, retries=2, retry_wait=0.5, timeout=30)
+
+    sent = [chunk_triples(request_string) for request_string, timeout in sparqler.requests]
+    assert sent.count([triples[0]]) == 1 # The chunk with a blank node is sent once.
+    assert sent.count([triples[1]]) == 3 # The other chunk is resent twice.
+    assert [seconds for seconds in waits if seconds > 0] == [0.5, 1.0] # Backoff doubles.
+    assert all(timeout == 30 for request_string, timeout in sparqler.requests)
+    assert summary['succeeded'] == 0
+    assert summary['failed'] == ['chunk 1 of 2', 'chunk 2 of 2']
+
+
+def test_triples_are_counted_at_the_update_endpoint(gui_module, monkeypatch):
+    sparqler = gui_module.Sparqler(method='post', endpoint=['http://example.org/primary', 'http://example.org/mirror'], sleep=0)
+    counted_at = []
+    def fake_query(counter, query_string, **kwargs):
+        counted_at.append(counter.endpoints)
+        return [{'count': {'type': 'literal', 'value': '50'}}]
+    monkeypatch.setattr(gui_module.Sparqler, 'query', fake_query)
+    assert sparqler.count_triples('http://example.org/graph') == 50
+    assert counted_at == [['http://example.org/primary']]
+
+
+def test_triples_loaded_are_counted_without_the_response_cache(sparqler, gui_module, monkeypatch, tmp_path):
+    monkeypatch.setattr(gui_module, 'RESPONSE_CACHE', gui_module.ResponseCache(str(tmp_path / 'cache.db')))
+    counts = iter([100, 250])
+    def fake_send_query(counter, endpoint, payload, headers):
+        response = FakeResponse(True)
+        response.text = '{"head": {"vars": ["count"]}, "results": {"bindings": [{"count": {"type": "literal", "value": "' + str(next(counts)) + '"}}]}}'
+        return response
+    monkeypatch.setattr(gui_module.Sparqler, '_send_query', fake_send_query)
+    summary = sparqler.load_many({'http://example.org/data.ttl': 'http://example.org/graph'}, count_triples=True)
+    assert summary['triples'] == 150
@@ -0,0 +1,52 @@
+"""Resuming an interrupted crawl_hierarchy() from its checkpoint gives the same report as a crawl without interruption."""
+import csv
+import json
+
+import pytest
+
+FIELDS = ['scheme', 'iri', 'depth']
+ROOTS = [{'scheme': 'aat', 'iri': 'r', 'label': 'root', 'depth': 0, 'parent': ''}]
+
+
+def make_visit(stop_iri=None):
+    def visit(node):
+        if node['iri'] == stop_iri:
+            raise KeyboardInterrupt
+        narrower = [] if node['depth'] >= 4 else [{'iri': node['iri'] + '/' + str(number), 'label': 'x'} for number in range(3)]
+        return {'scheme': node['scheme'], 'iri': node['iri'], 'depth': node['depth']}, narrower
+    return visit
+
+
+def crawl(gui_module, tmp_path, roots, visit):
+    gui_module.crawl_hierarchy(roots, visit, max_workers=1, checkpoint_path=str(tmp_path / 'crawl.json'),
+                               report_path=str(tmp_path / 'report.csv'), report_fields=FIELDS, verbose=False)
+
+
+def report_rows(tmp_path):
+    with open(tmp_path / 'report.csv', 'rt', encoding='utf-8', newline='') as file_object:
+        return list(csv.DictReader(file_object))
+
+
+@pytest.mark.parametrize('stop_point', ['after_append', 'before_append', 'during_append'])
+def test_resumed_crawl_matches_uninterrupted_crawl(gui_module, tmp_path, stop_point):
+    (tmp_path / 'full').mkdir()
+    crawl(gui_module, tmp_path / 'full', ROOTS, make_visit())
+    expected = report_rows(tmp_path / 'full')
+
+    with pytest.raises(KeyboardInterrupt):
+        crawl(gui_module, tmp_path, ROOTS, make_visit(stop_iri='r/1/2/0'))
+    # The interruption comes after the last batch was appended. Undo all or part of the append to
+    # simulate an interruption between the checkpoint and the append, or in the middle of the append.
+    with open(tmp_path / 'crawl.json', 'rt', encoding='utf-8') as file_object:
+        batch_size = len(json.load(file_object)['batch_rows'])
+    assert batch_size > 0
+    with open(tmp_path / 'report.csv', 'rt', encoding='utf-8', newline='') as file_object:
+        lines = file_object.read().splitlines(True)
+    before_batch = lines[:len(lines) - batch_size]
+    if stop_point == 'before_append':
+        (tmp_path / 'report.csv').write_text(''.join(before_batch), encoding='utf-8')
+    elif stop_point == 'during_append':
+        (tmp_path / 'report.csv').write_text(''.join(before_batch) + lines[len(before_batch)][:5], encoding='utf-8')
+
+    crawl(gui_module, tmp_path, [], make_visit())
+    assert report_rows(tmp_path) == expected
@@ -0,0 +1,35 @@
+"""Reuse of the views in the navigation history by show_from_history()."""
+import pytest
+
+AAT = 'http://vocab.getty.edu/aat/'
+
+
+@pytest.fixture
+def shown(gui_module, monkeypatch):
+    monkeypatch.setattr(gui_module, 'HISTORY', gui_module.NavigationHistory(max_bytes=1000000), raising=False)
+    views = []
+    monkeypatch.setattr(gui_module, 'show_snapshot', views.append)
+    return views
+
+
+def make_view(concept_iri, broader_iri):
+    return {'scheme': 'aat', 'classification': {'aat': concept_iri, 'broader': broader_iri},
+            'label': {'aat': 'Bowls', 'broader': 'Broader of ' + broader_iri}, 'match_type': {}, 'subclasses': [], 'artworks': []}
+
+
+def test_subclass_view_is_reused_from_the_same_broader_concept(gui_module, shown):
+    view = make_view(AAT + '2', AAT + '1')
+    gui_module.HISTORY.push(view)
+    assert gui_module.show_from_history('aat', AAT + '2', broader=(AAT + '1', 'Objects'))
+    assert shown == [view]
+
+
+def test_subclass_view_from_another_broader_concept_gets_that_concept(gui_module, shown):
+    view = make_view(AAT + '2', AAT + '1')
+    gui_module.HISTORY.push(view)
+    assert gui_module.show_from_history('aat', AAT + '2', broader=(AAT + '5', 'Vessels'))
+    assert shown[-1]['classification'] == {'aat': AAT + '2', 'broader': AAT + '5'}
+    assert shown[-1]['label'] == {'aat': 'Bowls', 'broader': 'Vessels'}
+    # The view in the history is left as it was.
+    assert view['classification']['broader'] == AAT + '1'
+    assert gui_module.HISTORY.views[-1] is shown[-1]
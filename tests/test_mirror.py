@@ -0,0 +1,176 @@
+"""Incremental sync of LocalMirror from a fake endpoint, and the snapshot data found from the mirror."""
+import hashlib
+import re
+
+import pytest
+
+WD = 'http://www.wikidata.org/entity/'
+AAT = 'http://vocab.getty.edu/aat/'
+P31 = 'http://www.wikidata.org/prop/direct/P31'
+P279 = 'http://www.wikidata.org/prop/direct/P279'
+RDFS_LABEL = 'http://www.w3.org/2000/01/rdf-schema#label'
+EXACT_MATCH = 'http://www.w3.org/2004/02/skos/core#exactMatch'
+BROADER_PREFERRED = 'http://vocab.getty.edu/ontology#broaderPreferred'
+XL_PREF_LABEL = 'http://www.w3.org/2008/05/skos-xl#prefLabel'
+XL_LITERAL_FORM = 'http://www.w3.org/2008/05/skos-xl#literalForm'
+CROSSWALK_GRAPH = 'https://art-classification-crosswalks'
+
+
+def iri(value):
+    return {'type': 'uri', 'value': value}
+
+def literal(value, language='en'):
+    return {'type': 'literal', 'value': value, 'xml:lang': language}
+
+def blank(label):
+    return {'type': 'bnode', 'value': label}
+
+
+class FakeEndpoint:
+    """Answers the queries of LocalMirror from triples held in memory, computing bucket checksums independently."""
+    def __init__(self, graphs):
+        self.graphs = graphs # graph IRI: list of (subject, predicate, object) binding dictionaries
+        self.fetches = [] # (graph IRI, list of buckets or None for the whole graph) of each query for triples
+
+    def query(self, sparqler, query_string, **kwargs):
+        if 'GRAPH ?g' in query_string:
+            return [{'g': iri(graph_uri)} for graph_uri in self.graphs if graph_uri != CROSSWALK_GRAPH]
+        graph_uri = re.search('FROM <([^>]*)>', query_string).group(1)
+        # Without the blank node filter, a real endpoint returns triples with blank nodes and no bucket.
+        skip_blank_nodes = 'isIRI(?s)' in query_string
+        triples = [triple for triple in self.graphs[graph_uri]
+                   if not (skip_blank_nodes and (triple[0]['type'] == 'bnode' or triple[2]['type'] == 'bnode'))
+                   and (graph_uri != CROSSWALK_GRAPH or triple[2]['type'] == 'uri')]
+        digits = int(re.search(r'MD5\(STR\(\?s\)\), 1, (\d+)\)', query_string).group(1)) if 'MD5(STR(?s))' in query_string else None
+        if 'GROUP BY ?bucket' in query_string:
+            signatures = {}
+            for subject, predicate, object_binding in triples:
+                bucket = None
+                if subject['type'] == 'uri' and object_binding['type'] != 'bnode':
+                    bucket = hashlib.md5(subject['value'].encode('utf-8')).hexdigest()[:digits]
+                triple_hash = hashlib.md5((subject['value'] + ' ' + predicate['value'] + ' ' + object_binding['value']).encode('utf-8')).hexdigest()
+                count, checksum = signatures.get(bucket, (0, 0))
+                signatures[bucket] = (count + 1, checksum + int(triple_hash[:8], 16))
+            results = []
+            for bucket, (count, checksum) in signatures.items():
+                result = {'count': literal(str(count), ''), 'checksum': literal(str(checksum), '')}
+                if bucket is not None:
+                    result['bucket'] = literal(bucket, '')
+                results.append(result)
+            return results
+        buckets = None
+        if digits is not None:
+            buckets = re.findall(r'"([0-9a-f]+)"', re.search(r'IN \(([^)]*)\)', query_string).group(1))
+        self.fetches.append((graph_uri, buckets))
+        return [{'s': subject, 'p': predicate, 'o': object_binding} for subject, predicate, object_binding in triples
+                if buckets is None or hashlib.md5(subject['value'].encode('utf-8')).hexdigest()[:digits] in buckets]
+
+
+@pytest.fixture
+def endpoint(gui_module, monkeypatch):
+    graphs = {
+        'http://wikidata': [
+            (iri(WD + 'Q100'), iri(P31), iri(WD + 'Q2')),
+            (iri(WD + 'Q100'), iri(RDFS_LABEL), literal('Zulu bowl')),
+            (iri(WD + 'Q2'), iri(P279), iri(WD + 'Q1')),
+            (iri(WD + 'Q2'), iri(RDFS_LABEL), literal('Bowl')),
+            (iri(WD + 'Q1'), iri(RDFS_LABEL), literal('Vessel')),
+            (iri(WD + 'Q1'), iri(RDFS_LABEL), literal('Gefäß', 'de')), # Not English, so not mirrored by a real endpoint
+            (blank('b0'), iri(RDFS_LABEL), literal('Blank')),
+        ],
+        'http://aat': [
+            (iri(AAT + '2'), iri(BROADER_PREFERRED), iri(AAT + '1')),
+            (iri(AAT + '2'), iri(XL_PREF_LABEL), iri(AAT + '2-label')),
+            (iri(AAT + '2-label'), iri(XL_LITERAL_FORM), literal('Bowls')),
+            (iri(AAT + '1'), iri(XL_PREF_LABEL), iri(AAT + '1-label')),
+            (iri(AAT + '1-label'), iri(XL_LITERAL_FORM), literal('Objects')),
+        ],
+        CROSSWALK_GRAPH: [
+            (iri(WD + 'Q2'), iri(EXACT_MATCH), iri(AAT + '2')),
+        ],
+    }
+    # The fake endpoint doesn't filter by language, so leave out the non-English label.
+    graphs['http://wikidata'] = [triple for triple in graphs['http://wikidata'] if triple[2].get('xml:lang') != 'de']
+    fake = FakeEndpoint(graphs)
+    monkeypatch.setattr(gui_module.Sparqler, 'query', lambda sparqler, query_string, **kwargs: fake.query(sparqler, query_string, **kwargs))
+    return fake
+
+
+def sync_all(mirror):
+    return {result['graph']: result for result in [mirror.sync_graph(graph_uri, verbose=False) for graph_uri in mirror.discover_graphs()]}
+
+
+def test_sync_applies_only_the_changes(gui_module, endpoint, tmp_path):
+    mirror = gui_module.LocalMirror(str(tmp_path / 'mirror.db'))
+
+    results = sync_all(mirror)
+    assert {graph_uri: (result['added'], result['removed']) for graph_uri, result in results.items()} == {
+        'http://wikidata': (5, 0), 'http://aat': (5, 0), CROSSWALK_GRAPH: (1, 0)}
+
+    # Nothing changed, so no buckets are downloaded.
+    results = sync_all(mirror)
+    assert [result['buckets_changed'] for result in results.values()] == [0, 0, 0]
+
+    # Edit a label (one triple removed and one added in the same bucket), add an artwork and remove a link.
+    wikidata = endpoint.graphs['http://wikidata']
+    wikidata.remove((iri(WD + 'Q1'), iri(RDFS_LABEL), literal('Vessel')))
+    wikidata.append((iri(WD + 'Q1'), iri(RDFS_LABEL), literal('Vessels')))
+    wikidata.append((iri(WD + 'Q101'), iri(P31), iri(WD + 'Q2')))
+    wikidata.append((iri(WD + 'Q101'), iri(RDFS_LABEL), literal('Ainu bowl')))
+    endpoint.graphs[CROSSWALK_GRAPH].clear()
+
+    results = sync_all(mirror)
+    assert (results['http://wikidata']['added'], results['http://wikidata']['removed']) == (3, 1)
+    assert results['http://wikidata']['buckets_changed'] == 2
+    assert (results['http://aat']['added'], results['http://aat']['removed']) == (0, 0)
+    assert (results[CROSSWALK_GRAPH]['added'], results[CROSSWALK_GRAPH]['removed']) == (0, 1)
+    assert results[CROSSWALK_GRAPH]['triples'] == 0
+
+    results = sync_all(mirror)
+    assert [result['buckets_changed'] for result in results.values()] == [0, 0, 0]
+
+
+def test_snapshot_data_from_mirror(gui_module, endpoint, tmp_path):
+    mirror = gui_module.LocalMirror(str(tmp_path / 'mirror.db'))
+    sync_all(mirror)
+    # Link the Wikidata class to the AAT concept, so the AAT concepts are linked to an artwork.
+    endpoint.graphs['http://wikidata'].append((iri(WD + 'Q2'), iri(EXACT_MATCH), iri(AAT + '2')))
+    sync_all(mirror)
+
+    labels, edges, crosswalks, matches, artworks, covered = mirror.snapshot_data()
+    assert labels == {WD + 'Q1': 'Vessel', WD + 'Q2': 'Bowl', AAT + '1': 'Objects', AAT + '2': 'Bowls'}
+    assert edges['wikidata'] == [(WD + 'Q2', WD + 'Q1')]
+    assert edges['aat'] == [(AAT + '2', AAT + '1')]
+    assert edges['nomenclature'] == []
+    assert crosswalks == [(WD + 'Q2', EXACT_MATCH, AAT + '2')]
+    assert matches == [(AAT + '2', WD + 'Q2')]
+    assert artworks == [{'class_iri': WD + 'Q2', 'artwork_iri': WD + 'Q100', 'artwork_label': 'Zulu bowl'}]
+    assert covered['wikidata'] == {WD + 'Q1', WD + 'Q2'}
+    assert covered['aat'] == {AAT + '1', AAT + '2'}
+
+    counts = gui_module.ConceptSnapshot.save(str(tmp_path / 'snapshot.bin'), labels, edges, crosswalks, matches, artworks, covered)
+    assert counts['artworks'] == 1
+    snapshot = gui_module.ConceptSnapshot(str(tmp_path / 'snapshot.bin'))
+    assert snapshot.broader(AAT + '2') == ('Objects', AAT + '1')
+
+
+def test_changed_buckets_are_fetched_in_one_query(gui_module, endpoint, tmp_path):
+    mirror = gui_module.LocalMirror(str(tmp_path / 'mirror.db'))
+    sync_all(mirror)
+    endpoint.fetches.clear()
+    wikidata = endpoint.graphs['http://wikidata']
+    wikidata.append((iri(WD + 'Q101'), iri(P31), iri(WD + 'Q2')))
+    wikidata.append((iri(WD + 'Q102'), iri(P31), iri(WD + 'Q2')))
+    results = sync_all(mirror)
+    assert results['http://wikidata']['buckets_changed'] == 2
+    assert [(graph_uri, len(buckets)) for graph_uri, buckets in endpoint.fetches] == [('http://wikidata', 2)]
+
+
+def test_whole_graph_is_fetched_when_many_buckets_changed(gui_module, endpoint, tmp_path, monkeypatch):
+    # With 16 buckets, more than 1.6 buckets changed in the Wikidata and AAT graphs, but only one in the crosswalk graph.
+    monkeypatch.setattr(gui_module.LocalMirror, 'FULL_FETCH_FRACTION', 0.1)
+    mirror = gui_module.LocalMirror(str(tmp_path / 'mirror.db'), bucket_digits=1)
+    results = sync_all(mirror)
+    assert sorted(endpoint.fetches, key=str) == [('http://aat', None), ('http://wikidata', None), (CROSSWALK_GRAPH, ['4'])]
+    assert (results['http://wikidata']['added'], results['http://wikidata']['removed']) == (5, 0)
+    assert [result['buckets_changed'] for result in sync_all(mirror).values()] == [0, 0, 0]
@@ -0,0 +1,79 @@
+"""Round trip of the binary concept snapshot: ConceptSnapshot.save() then ConceptSnapshot(path)."""
+import pytest
+
+WD = 'http://www.wikidata.org/entity/'
+AAT = 'http://vocab.getty.edu/aat/'
+NOM = 'https://nomenclature.info/nom/'
+EXACT_MATCH = 'http://www.w3.org/2004/02/skos/core#exactMatch'
+
+
+def save_example(gui_module, path):
+    labels = {WD + 'Q1': 'Vessel', WD + 'Q2': 'Bowl', WD + 'Q3': 'Cup', AAT + '1': 'Objects', AAT + '2': 'Bowls',
+              NOM + '1': 'Containers', NOM + '2': 'Tray'}
+    edges = {'wikidata': [(WD + 'Q2', WD + 'Q1'), (WD + 'Q3', WD + 'Q1')],
+             'aat': [(AAT + '2', AAT + '1')],
+             'nomenclature': [(NOM + '2', NOM + '1')]}
+    # AAT 3 is only in the crosswalk graph: it has no artworks, so the snapshot doesn't cover it.
+    crosswalks = [(WD + 'Q2', EXACT_MATCH, AAT + '2'), (NOM + '2', EXACT_MATCH, AAT + '3')]
+    matches = [(AAT + '2', WD + 'Q2')]
+    artworks = [{'class_iri': WD + 'Q2', 'artwork_iri': WD + 'Q100', 'artwork_label': 'Zulu bowl'},
+                {'class_iri': WD + 'Q2', 'artwork_iri': WD + 'Q101', 'artwork_label': 'Ainu bowl'},
+                {'class_iri': WD + 'Q3', 'artwork_iri': WD + 'Q102', 'artwork_label': 'Tea cup'}]
+    covered = {'wikidata': {WD + 'Q1', WD + 'Q2', WD + 'Q3'}, 'aat': {AAT + '1', AAT + '2'}, 'nomenclature': {NOM + '1', NOM + '2'}}
+    return gui_module.ConceptSnapshot.save(str(path), labels, edges, crosswalks, matches, artworks, covered)
+
+
+def test_round_trip(gui_module, tmp_path):
+    counts = save_example(gui_module, tmp_path / 'snapshot.bin')
+    assert counts == {'iris': 12, 'broader_links': 4, 'crosswalk_pairs': 2, 'matched_classes': 1, 'artworks': 3}
+
+    snapshot = gui_module.ConceptSnapshot(str(tmp_path / 'snapshot.bin'))
+    assert snapshot.count == 12
+    assert snapshot.label_of(WD + 'Q1') == 'Vessel'
+    assert snapshot.label_of(WD + 'Q100') == 'Zulu bowl'
+    assert snapshot.narrower('wikidata', WD + 'Q1') == [{'iri': WD + 'Q2', 'label': 'Bowl'}, {'iri': WD + 'Q3', 'label': 'Cup'}]
+    assert snapshot.narrower('wikidata', WD + 'Q2') == []
+    assert snapshot.broader(AAT + '2') == ('Objects', AAT + '1')
+    assert snapshot.broader(NOM + '1') == ('', '')
+    assert snapshot.equivalents(WD + 'Q2') == {'aat': [(EXACT_MATCH, AAT + '2')]}
+    assert [artwork['artwork_label'] for artwork in snapshot.included_artworks('wikidata', WD + 'Q1')] == ['Ainu bowl', 'Zulu bowl', 'Tea cup']
+    assert [artwork['artwork_iri'] for artwork in snapshot.included_artworks('aat', AAT + '1')] == [WD + 'Q101', WD + 'Q100']
+    assert snapshot.included_artworks('nomenclature', NOM + '1') == []
+
+
+def test_uncovered_iris_return_none(gui_module, tmp_path):
+    save_example(gui_module, tmp_path / 'snapshot.bin')
+    snapshot = gui_module.ConceptSnapshot(str(tmp_path / 'snapshot.bin'))
+
+    # In the string table, but not a concept with artworks: a crosswalk-only concept, a predicate and an artwork.
+    for iri in [AAT + '3', EXACT_MATCH, WD + 'Q100']:
+        assert snapshot.find(iri) is not None
+        assert snapshot.broader(iri) is None
+        assert snapshot.equivalents(iri) is None
+    assert snapshot.narrower('aat', AAT + '3') is None
+    assert snapshot.included_artworks('aat', AAT + '3') is None
+    # Covered, but as a concept of a different scheme
+    assert snapshot.narrower('aat', WD + 'Q1') is None
+    # Not in the snapshot at all
+    assert snapshot.find(WD + 'Q999') is None
+    assert snapshot.label_of(WD + 'Q999') is None
+    assert snapshot.narrower('wikidata', WD + 'Q999') is None
+
+
+def test_empty_snapshot(gui_module, tmp_path):
+    counts = gui_module.ConceptSnapshot.save(str(tmp_path / 'empty.bin'), {}, {'wikidata': [], 'aat': [], 'nomenclature': []}, [], [], [], {})
+    assert counts == {'iris': 0, 'broader_links': 0, 'crosswalk_pairs': 0, 'matched_classes': 0, 'artworks': 0}
+
+    snapshot = gui_module.ConceptSnapshot(str(tmp_path / 'empty.bin'))
+    assert snapshot.count == 0
+    assert snapshot.find(WD + 'Q1') is None
+    assert snapshot.narrower('wikidata', WD + 'Q1') is None
+    assert snapshot.broader(WD + 'Q1') is None
+    assert snapshot.equivalents(WD + 'Q1') is None
+    assert snapshot.included_artworks('wikidata', WD + 'Q1') is None
+
+
+def test_rejects_other_files(gui_module, tmp_path):
+    (tmp_path / 'other.bin').write_bytes(b'not a snapshot at all')
+    with pytest.raises(ValueError):
+        gui_module.ConceptSnapshot(str(tmp_path / 'other.bin'))